@@ -1,31 +1,223 @@
+import atexit
+import hashlib
+import math
 import os
-import sqlite3
-from flask import Flask, request, jsonify, render_template_string, redirect, url_for
+import threading
+import time
+import click
+from flask import Flask, Response, request, jsonify, redirect, url_for
 from datetime import datetime, timedelta
+from urllib.parse import urlencode
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.wsgi import ClosingIterator
+
+import assets
+import config
+import dedup
+import journal
+import metrics
+import order_store
+import pages
+import qrimages
+import ratelimit
+import seatlink
+import stats
+import storage
+import stores
+from events import stream
+from pages import cached_page, render_page
 
 # Flask 애플리케이션 생성
 app = Flask(__name__)
+# 요청마다 매장을 구분 (호스트 이름 또는 /s/<매장 키>/...)
+app.wsgi_app = stores.StoreMiddleware(app.wsgi_app)
+app.teardown_request(stores.release_current)
+if config.PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=config.PROXY_COUNT)
+
+# 정적 파일(해시 파일명 + 사전 압축)과 페이지 템플릿은 시작 시 한 번만 준비
+assets.init_app(app)
+pages.init_app(app)
+metrics.init_app(app)
+app.jinja_env.globals["offline_ordering"] = config.OFFLINE_ORDERING
+
+# 시작 준비: 매장 DB 열기(스키마 마이그레이션 + 저널 복구), 메뉴 캐시, 자주 쓰는 페이지 미리 렌더링
+# STORE_CACHE_SIZE 개 매장까지만 미리 열고, 나머지 매장은 첫 요청 때 열림
+# 매장마다 DB 커넥션 풀과 주문 INSERT 그룹 커밋 큐가 따로 있음
+# gunicorn.conf.py (preload) 에서는 마스터에서 한 번만 실행되고, 워커는 준비된 메모리를 copy-on-write 로 함께 씀
+def warm_up():
+    global warm_seconds
+    started = time.perf_counter()
+    client = app.test_client()
+    for key, settings in list(config.STORES.items())[:config.STORE_CACHE_SIZE]:
+        store = stores.registry.get(key)
+        if not config.WARM_UP_PAGES:
+            continue
+        # 손님이 들어오는 주소와 같은 캐시 항목을 채우도록 매장 호스트 또는 /s/<키> 경로로 요청
+        hosts = settings.get("hosts") or []
+        prefix = "" if hosts or key == config.DEFAULT_STORE else f"/s/{key}"
+        base_url = f"http://{hosts[0]}" if hosts else "http://localhost"
+        paths = [f"{prefix}/admin", f"{prefix}/api/menu"] + [
+            f"{prefix}/{page}?seat={seat}&t={seatlink.token(key, seat)}"
+            for seat in store.seats for page in ("order", "order-complete")]
+        for path in paths:
+            client.get(path, base_url=base_url, environ_overrides={"qr.warm_up": True})
+    warm_seconds = round(time.perf_counter() - started, 3)
+
+warm_seconds = None
+
+# 종료 시 매장마다 그룹 커밋 큐에 남은 주문을 커밋하고 DB 를 닫음
+atexit.register(stores.registry.close_all)
+
+# 워커 프로세스 준비 (프로세스마다 한 번): 열려 있는 매장의 커넥션/저널 복구, 이력 이동 백그라운드 작업
+# gunicorn 은 post_fork 에서 호출하고, 그 밖의 서버(개발 서버 등)는 첫 요청 때 호출됨
+# 마스터는 요청을 받지 않으므로 백그라운드 스레드가 마스터에서 돌지 않음
+ready_pid = None
+_prepare_lock = threading.Lock()
+
+def prepare_worker():
+    global ready_pid
+    with _prepare_lock:
+        if ready_pid == os.getpid():
+            return
+        for store in stores.registry.open_stores():
+            store.prepare_worker()
+        # 서빙 완료된 주문을 주기적으로 이력 테이블로 이동 (열려 있는 매장만)
+        if config.ARCHIVE_INTERVAL_SECONDS:
+            storage.start_archiver(lambda: [store.storage for store in stores.registry.open_stores()],
+                                   config.ARCHIVE_INTERVAL_SECONDS, config.ARCHIVE_AFTER_MINUTES)
+        ready_pid = os.getpid()
+
+# gunicorn pre_fork: 메모리 엔진은 fork 전에 마스터의 내용을 스냅샷으로 남김
+def before_fork():
+    for store in stores.registry.open_stores():
+        store.before_fork()
+
+@app.before_request
+def ensure_worker_ready():
+    if ready_pid != os.getpid() and not request.environ.get("qr.warm_up") and request.endpoint != "healthz":
+        prepare_worker()
+
+# 주문 링크(QR) 검사: 없는 좌석이나 서명이 맞지 않는 링크는 요청 제한/DB 보다 먼저 거절
+# 주문 완료 페이지는 서명 없이 열리므로 좌석만 확인 (아무 좌석 문자열로 페이지 캐시를 채우지 못하게)
+@app.before_request
+def check_seat_link():
+    seat = request.args.get("seat", "1")
+    if request.endpoint == "order":
+        error = seatlink.check(stores.current(), seat, request.args.get("t"))
+    elif request.endpoint == "order_complete":
+        error = None if seatlink.has_seat(stores.current(), seat) else "없는 좌석입니다."
+    else:
+        return None
+    if error is None:
+        return None
+    message = f"{error} QR 코드를 다시 스캔해주세요. (Invalid seat link) (座位链接无效)"
+    if request.method == "POST":
+        return jsonify({"error": message}), 403
+    return message, 403, {"Content-Type": "text/plain; charset=utf-8"}
+
+@app.cli.command("archive-orders")
+def archive_orders_command():
+    for key in config.STORES:
+        moved = stores.registry.get(key).storage.archive(config.ARCHIVE_AFTER_MINUTES)
+        print(f"[{key}] {moved}건의 주문을 이력 테이블로 옮겼습니다.")
 
-# 데이터베이스 파일 경로
-DB_FILE = "app.db"
-
-# 테이블 생성 (앱 실행 시 한 번 실행됨)
-def create_tables():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS orders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            seat TEXT NOT NULL,
-            salt TEXT NOT NULL,
-            drink TEXT NOT NULL,
-            status TEXT NOT NULL DEFAULT '대기 중'
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-create_tables()
+# 저장된 주문의 멱등 키로 다시 보낸 요청인지 (잘못된 키는 엔드포인트가 400 으로 응답)
+def is_replay():
+    data = request.get_json(silent=True)
+    try:
+        key = dedup.request_key(request.headers, data if isinstance(data, dict) else None)
+    except dedup.InvalidKey:
+        return False
+    return key is not None and existing_order(key) is not None
+
+# 쓰기 요청(POST) 제한: 주문 DB 를 건드리기 전에 좌석/IP 별 토큰 버킷으로 먼저 거절
+# 이미 처리한 멱등 키로 다시 들어온 주문(중복 터치, 오프라인 재전송)은 쓰기를 하지 않으므로 토큰을 쓰지 않음
+@app.before_request
+def limit_writes():
+    if not config.RATE_LIMIT_ENABLED or request.method != "POST":
+        return None
+    if request.endpoint in ("order", "master_order") and is_replay():
+        return None
+    ip = request.remote_addr or "-"
+    if request.endpoint == "order":
+        seat = f"{stores.current().key}:{request.args.get('seat', '1')}"
+        checks = [("order_seat", seat), ("order_ip", ip)]
+    else:
+        checks = [("admin_ip", ip)]
+    retry_after = ratelimit.limiter.check(checks)
+    if retry_after is None:
+        return None
+    return (jsonify({"error": "요청이 너무 많습니다. 잠시 후 다시 시도해주세요. (Too many requests)"}), 429,
+            {"Retry-After": str(math.ceil(retry_after))})
+
+@app.cli.command("rebuild-stats")
+def rebuild_stats_command():
+    for key in config.STORES:
+        stores.registry.get(key).storage.rebuild_stats()
+        print(f"[{key}] 판매 통계를 다시 만들었습니다.")
+
+# 매장의 이벤트 저널로 새 DB 파일을 만듦 (운영 DB 는 건드리지 않음, 검증/복구용)
+# 예: flask replay-journal rebuilt.db --store main
+@app.cli.command("replay-journal")
+@click.argument("target")
+@click.option("--store", "key", default=config.DEFAULT_STORE)
+def replay_journal_command(target, key):
+    store = stores.registry.get(key)
+    if store is None or store.journal is None:
+        raise click.ClickException(f"저널을 사용하는 매장이 아닙니다: {key}")
+    store.journal.flush()
+    count = journal.rebuild(store.journal.path, target)
+    print(f"[{key}] 이벤트 {count}건으로 {target} 를 만들었습니다.")
+
+# 현재 요청 매장의 저장소
+def get_storage():
+    return stores.current().storage
+
+# 메뉴는 워커별 캐시에서 가져옴 (버전이 바뀌었을 때만 DB 에서 다시 읽음)
+def menu():
+    return get_storage().menu()
+
+@app.context_processor
+def inject_menu():
+    return {"menu": menu(), "store": stores.current()}
+
+# 같은 멱등 키로 이미 저장된 주문 id (없으면 None)
+def existing_order(key):
+    return get_storage().find_order(key)
+
+# 주문 저장 후 관리자 화면에 알림 (손님 주문/마스터 주문 공통)
+# 같은 키로 동시에 들어온 중복이면 처음 주문 id 만 돌려주고 알리지 않음
+def place_order(seat, salt, drink, key=None):
+    store = stores.current()
+    order_id, created = store.storage.create_order(seat, salt.id, drink.id, key)
+    if not created:
+        return order_id
+    store.broker.publish("order-created", {"id": order_id, "seat": str(seat),
+                                     "salt_id": salt.id, "drink_id": drink.id,
+                                     "salt": salt.code, "drink": drink.code,
+                                     "status": order_store.STATUS_WAITING})
+    return order_id
+
+# 요청의 멱등 키 (잘못된 키면 400 응답을 돌려줌)
+# 실패하면 (None, 오류 응답)
+def request_key(data):
+    try:
+        return dedup.request_key(request.headers, data), None
+    except dedup.InvalidKey:
+        return None, (jsonify({"error": "잘못된 주문 키입니다. (Invalid idempotency key)"}), 400)
+
+# 요청의 saltType/drink 값(메뉴 id, 예전 페이지라면 메뉴 이름)을 메뉴 항목으로 변환
+# 실패하면 (None, None, 오류 응답)
+def resolve_menu_items(data):
+    current = menu()
+    salt = current.resolve("salt", data.get("saltType"))
+    drink = current.resolve("drink", data.get("drink"))
+    if salt is None or drink is None:
+        return None, None, (jsonify({"error": "메뉴를 선택해주세요. (Please choose from the menu)"}), 400)
+    if not (salt.available and drink.available):
+        return None, None, (jsonify({"error": "품절된 메뉴입니다. (Sold out) (已售罄)"}), 409)
+    return salt, drink, None
 
 # 주문 페이지 (QR 스캔)
 @app.route("/order", methods=["GET", "POST"])
@@ -33,526 +225,311 @@ def order():
     seat_number = request.args.get("seat", "1")
 
     if request.method == "POST":
-        data = request.json
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO orders (seat, salt, drink) 
-            VALUES (?, ?, ?)
-        """, (seat_number, data.get("saltType"), data.get("drink")))
-        conn.commit()
-        conn.close()
-        return jsonify({"message": "주문이 완료되었습니다! (Order completed!) (订单已完成!)"})
-
-    return render_template_string('''
-    <html>
-    <head>
-        <title>QR 주문</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1">
-        <style>
-            body {
-                font-family: 'Noto Sans', sans-serif;
-                margin: 0;
-                padding: 0;
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                justify-content: center;
-                height: 100vh;
-                text-align: center;
-                background-color: #FAF3E0;
-            }
-            .container {
-                background: white;
-                padding: 20px;
-                border-radius: 12px;
-                box-shadow: 0 4px 10px rgba(0, 0, 0, 0.1);
-                max-width: 350px;
-                width: 90%;
-            }
-            select, button {
-                font-size: 18px;
-                padding: 10px;
-                margin: 10px 0;
-                width: 100%;
-                border-radius: 8px;
-                border: 1px solid #ccc;
-            }
-            button {
-                background-color: #4CAF50;
-                color: white;
-                border: none;
-                cursor: pointer;
-            }
-            button:hover {
-                background-color: #45a049;
-            }
-            .logo - container{
-                position: fixed; /* 화면 최상단 고정 */
-                top : 0;
-                left: 50 %;
-                transform: translateX(-50 %); /* 가운데 정렬 */
-                width: 100 %;
-                text - align: center;
-                padding: 10px 0;
-                z - index: 1000; /* 다른 요소보다 위에 위치 */
-            }
-            .logo{
-                width: 120px;  /* 로고 크기 조절 */
-                height: 120px;
-                border - radius: 50 %; /* 원형 유지 */
-                object - fit: cover;
-            }
-            table {
-                width: 100%;
-                border-collapse: collapse;
-                margin-top: 20px;
-            }
-            table, th, td {
-                border: 1px solid #ddd;
-                padding: 8px;
-                text-align: center;
-            }
-            th {
-                background-color: #4CAF50;
-                color: white;
-            }
-        </style>
-        <script>
-            function placeOrder() {
-                let salt = document.getElementById('salt').value;
-                let drink = document.getElementById('drink').value;
-                fetch(window.location.href, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ saltType: salt, drink: drink })
-                }).then(() => {
-                    window.location.href = "/order-complete?seat=" + {{ seat_number }};
-                });
-            }
-        </script>
-    </head>
-    <body>
-	<div class="logo-container">
-    		<img src="{{ url_for('static', filename='logo.png') }}" class="logo" alt="Logo">
-	</div>
-	<div class="announcement">
-    		불편하신 점이 있다면 직원을 불러주세요😊<br/>
-    		(If you have any inconvenience, please call a staff member!)<br/>
-    		(如果有不便之处，请呼叫工作人员!)
-	</div>
-        <div class="container">
-           <h2>자리 {{ seat_number }}번 (Seat No. {{ seat_number }}) (座位 {{ seat_number }})</h2>
-           <label>족욕 소금 선택 (Foot Bath Salt) (足浴盐选择):</label>
-            <select id="salt">
-                <option value="라벤더">라벤더 (Lavender / 薰衣草)</option>
-                <option value="스피아민트">스피아민트 (Spearmint / 留兰香)</option>
-                <option value="히말라야">히말라야 (Himalayan / 喜马拉雅)</option>
-            </select><br/>
-            <label>음료 선택 (Drink Selection) (饮料选择):</label>
-            <select id="drink">
-    <option value="아메리카노(HOT)">아메리카노(Americano)(HOT) / 美式咖啡 (热)</option>
-    <option value="아메리카노(COLD)">아메리카노(Americano)(COLD) / 美式咖啡 (冰)</option>
-    <option value="캐모마일(HOT)">캐모마일(Chamomile)(HOT) / 洋甘菊茶 (热)</option>
-    <option value="캐모마일(COLD)">캐모마일(Chamomile)(COLD) / 洋甘菊茶 (冰)</option>
-    <option value="페퍼민트(HOT)">페퍼민트(peppermint)(HOT) / 薄荷茶 (热)</option>
-    <option value="페퍼민트(COLD)">페퍼민트(peppermint)(COLD) / 薄荷茶 (冰)</option>
-    <option value="루이보스(HOT)">루이보스(Rooibos)(HOT) / 南非红茶 (热)</option>
-    <option value="루이보스(COLD)">루이보스(Rooibos)(COLD) / 南非红茶 (冰)</option>
-    <option value="얼그레이(HOT)">얼그레이(Earlgray)(HOT) / 伯爵茶 (热)</option>
-    <option value="얼그레이(COLD)">얼그레이(Earlgray)(COLD) / 伯爵茶 (冰)</option>
-    <option value="핫초코(Only HOT)">핫초코(Hot chocolate)(Only HOT) / 热巧克力</option>
-    <option value="아이스티(Only ICE)">아이스티(Iced Tea)(Only ICE) / 冰茶</option>
-    <option value="사과주스(Only ICE)">사과주스(Apple Juice)(Only ICE) / 苹果汁</option>
-    <option value="오렌지주스(Only ICE)">오렌지주스(Orange Juice)(Only ICE) / 橙汁</option>
-</select><br/>
-            <button onclick="placeOrder()">주문하기 (Order Now)</button>
-        </div>
-	<div class="announcement">즐거운 시간 보내세요! (Enjoy your time!) (祝您玩得开心!)</div>
-    </body>
-    </html>
-    ''', seat_number=seat_number)
+        message = {"message": "주문이 완료되었습니다! (Order completed!) (订单已完成!)"}
+        key, error = request_key(request.json)
+        if error:
+            return error
+        # 재시도/중복 터치: 처음 결과를 그대로 돌려주고 쓰기는 하지 않음
+        if existing_order(key) is not None:
+            return jsonify(message), 200, {"Idempotent-Replayed": "true"}
+        salt, drink, error = resolve_menu_items(request.json)
+        if error:
+            return error
+        place_order(seat_number, salt, drink, key)
+        return jsonify(message)
+
+    # 좌석 번호와 메뉴 버전만으로 결정되는 페이지라 완성된 바이트를 캐시해서 재사용
+    return cached_page("order", menu().version, config.ORDER_PAGE_MAX_AGE,
+                       store_key=stores.current().key, root=request.script_root,
+                       seat_number=seat_number)
 
 # ✅ 주문 완료 페이지 (애드핏 광고 배치)
 @app.route("/order-complete")
 def order_complete():
     seat_number = request.args.get("seat", "1")
 
-    return render_template_string('''
-    <html>
-    <head>
-        <title>주문 완료 | Order Complete | 订单完成</title>
-        <meta name="robots" content="index, follow">
-        <meta name="viewport" content="width=device-width, initial-scale=1">
-        <style>
-            body {
-                font-family: 'Noto Sans', sans-serif;
-                margin: 0;
-                padding: 0;
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                justify-content: center;
-                height: 100vh;
-                text-align: center;
-                background-color: #FAF3E0;
-            }
-            .container {
-                background: white;
-                padding: 20px;
-                border-radius: 12px;
-                box-shadow: 0 4px 10px rgba(0, 0, 0, 0.1);
-                max-width: 350px;
-                width: 90%;
-            }
-            .highlight {
-                font-size: 20px;
-                font-weight: bold;
-                color: #4CAF50;
-            }
-            .announcement {
-                margin-top: 15px;
-                font-size: 14px;
-                color: #666;
-                line-height: 1.6;
-            }
-            /* ✅ 광고 배너 스타일 */
-            .ad-container {
-                margin-top: 20px;
-                text-align: center;
-                width: 100%;
-            }
-            .scroll-ad {
-                width: 100%;
-                text-align: center;
-                margin-top: 30px;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h2>🎉 주문 완료 | Order Complete | 订单完成</h2>
-            <p>자리 <span class="highlight">{{ seat_number }}</span>번의 주문이 정상적으로 접수되었습니다.</p>
-            <p>Order for seat <span class="highlight">{{ seat_number }}</span> has been successfully received.</p>
-            <p>座位 <span class="highlight">{{ seat_number }}</span> 的订单已成功提交。</p>
-
-            <p>주문이 준비되면 직원이 알려드립니다! 😊</p>
-            <p>Our staff will notify you when your order is ready. 😊</p>
-            <p>您的订单准备好后，工作人员会通知您。 😊</p>
-
-            <div class="announcement">
-                추가로 궁금한 사항이 있으면 직원을 불러주세요.<br/>
-                If you have any inquiries, please call a staff member.<br/>
-                如果您有任何疑问，请呼叫工作人员。
-            </div>
-            <p style="font-size: 14px; color: #666;"> "📢 광고 클릭은 개발자에게 큰 힘이 됩니다! | Clicking ads greatly supports the developer! | 点击广告对开发者大有帮助！"</p>
-
-            <!-- ✅ 중앙 배너 광고 -->
-            <div class="ad-container">
-            <script type="text/javascript" src="//t1.daumcdn.net/kas/static/ba.min.js"></script>
-            <ins class="kakao_ad_area" style="display:none;"
-                 data-ad-unit="DAN-NO3XVRFTivoc3r2E"
-                 data-ad-width="320"
-                 data-ad-height="50"></ins>
-            <script>
-                kakaoAdfit.push({});
-            </script>
-            </div>
-        </div>
-
-            <!-- ✅ 스크롤 가능한 배너 광고 -->
-            <div class="scroll-ad">
-                <script src="https://ads-partners.coupang.com/g.js"></script>
-                <script>
-                    new PartnersCoupang.G({"id":848440,"template":"carousel","trackingCode":"AF6385937","width":"320","height":"100","tsource":""});
-                </script>
-            <!-- ✅ 대가성 문구 추가 (announcement 클래스 활용) -->
-            <div class="announcement">
-                ※ 이 포스팅은 쿠팡 파트너스 활동의 일환으로, 이에 따른 일정액의 수수료를 제공받습니다.<br/>
-            </div>
-    </body>
-    </html>
-    ''', seat_number=seat_number)
+    return cached_page("order_complete", menu().version, config.ORDER_PAGE_MAX_AGE,
+                       store_key=stores.current().key, root=request.script_root,
+                       seat_number=seat_number)
 
 
 
 # 관리자 페이지 (자리 형상화 UI)
+# 주문 내용은 화면이 /api/orders 로 받아서 그리므로 페이지 자체는 고정된 껍데기라 캐시 가능
 @app.route("/admin")
 def admin():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM orders")
-    orders_raw = cursor.fetchall()
-    conn.close()
-
-    orders = {}
-    for order in orders_raw:
-        order_id, seat, salt, drink, status = order
-        if seat not in orders:
-            orders[seat] = []
-        orders[seat].append({"id": order_id, "salt": salt, "drink": drink, "status": status})
-
-    return render_template_string('''
-    <html>
-    <head>
-        <title>관리자 페이지</title>
-        <style>
-            body {
-                font-family: 'Noto Sans', sans-serif;
-                text-align: center;
-                background: linear-gradient(to bottom, #3b8ed6, #dff6ff);
-                color: white;
-            }
-            .layout {
-                display: flex;
-                flex-direction: row;
-                align-items: center;
-                justify-content: center;
-                gap: 50px;
-            }
-            .seat-container {
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                justify-content: center;
-                gap: 20px;
-            }
-            .seat {
-                background: rgba(255, 255, 255, 0.8);
-                padding: 10px;
-                border-radius: 8px;
-                text-align: center;
-                color: black;
-                font-size: 14px;
-                font-weight: bold;
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                justify-content: center;
-                height: 80px;
-                width: 80px;
-                cursor: pointer;
-                position: relative;
-            }
-            .seat.occupied {
-                background: #ffcc00;
-            }
-            .seat .delete-btn {
-                font-size: 12px;
-                color: white;
-                background: red;
-                padding: 5px 10px;
-                border-radius: 5px;
-                cursor: pointer;
-                border: none;
-                margin-top: 5px;
-            }
-            .row {
-                display: flex;
-                justify-content: center;
-                gap: 10px;
-            }
-            .column {
-                display: flex;
-                flex-direction: column;
-                gap: 10px;
-            }
-            .delete-all-btn {
-                margin-top: 20px;
-                padding: 10px 15px;
-                font-size: 16px;
-                background: black;
-                color: white;
-                border: none;
-                cursor: pointer;
-                border-radius: 5px;
-            }
-            .delete-all-btn:hover {
-                background: gray;
-            }    
-            .logo - container{
-                position: fixed; /* 화면 최상단 고정 */
-                top : 0;
-                left: 50 %;
-                transform: translateX(-50 %); /* 가운데 정렬 */
-                width: 100 %;
-                text - align: center;
-                padding: 10px 0;
-                z - index: 1000; /* 다른 요소보다 위에 위치 */
-            }
-            .logo{
-                width: 120px;  /* 로고 크기 조절 */
-                height: 120px;
-                border - radius: 50 %; /* 원형 유지 */
-                object - fit: cover;
-            }
-        </style>
-        <script>
-            function deleteOrder(orderId) {
-                fetch('/delete-order', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ id: orderId })
-                }).then(() => location.reload());
-            }
-            function deleteAllOrders() {
-                fetch('/delete-all-orders', {
-                    method: 'POST'
-                }).then(() => location.reload());
-            }
-        </script>
-    <script>
-            setInterval(() => {
-                location.reload();
-            }, 30000); // 30초마다 새로고침
-        </script>
-        <script>
-            function toggleMasterForm() {
-                const form = document.getElementById("master-order-form");
-                form.style.display = form.style.display === "none" ? "block" : "none";
-            }
-
-            function submitMasterOrder() {
-                const seat = document.getElementById("master-seat").value;
-                const salt = document.getElementById("master-salt").value;
-                const drink = document.getElementById("master-drink").value;
-
-                if (!seat || !salt || !drink) {
-                    alert("모든 항목을 선택해주세요.");
-                    return;
-                }
-
-                fetch('/master-order', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ seat: seat, saltType: salt, drink: drink })
-                }).then(res => res.json()).then(data => {
-                    alert(data.message);
-                    location.reload();
-                });
-            }
-        </script>
-    </head>
-    <body>
-	<div class="logo-container">
-    		<img src="{{ url_for('static', filename='logo.png') }}" class="logo" alt="Logo">
-	</div>
-        <h2>주문 관리</h2>
-        <div class="layout">
-            <div class="column">
-                {% for seat_number in range(12, 8, -1) %}
-                    <div class="seat {% if orders.get(seat_number|string) %}occupied{% endif %}">
-                        {{ seat_number }}번
-                        {% for order in orders.get(seat_number|string, []) %}
-                            <div>{{ order.salt }}</div>
-                            <div>{{ order.drink }}</div>
-                            <button class="delete-btn" onclick="deleteOrder('{{ order.id }}')">삭제</button>
-                        {% endfor %}
-                    </div>
-                {% endfor %}
-            </div>
-            <div class="seat-container">
-                <div class="row">
-                    {% for seat_number in range(1, 9) %}
-                        <div class="seat {% if orders.get(seat_number|string) %}occupied{% endif %}">
-                            {{ seat_number }}번
-                            {% for order in orders.get(seat_number|string, []) %}
-                                <div>{{ order.salt }}</div>
-                                <div>{{ order.drink }}</div>
-                                <button class="delete-btn" onclick="deleteOrder('{{ order.id }}')">삭제</button>
-                            {% endfor %}
-                        </div>
-                    {% endfor %}
-                </div>
-            </div>
-        </div>
-        <button class="delete-all-btn" onclick="deleteAllOrders()">모든 주문 삭제</button>
-        <button onclick="toggleMasterForm()">마스터 주문 입력</button>
-
-        <div id="master-order-form" style="display: none; margin-top: 20px; background: white; padding: 15px; color: black; border-radius: 10px;">
-            <h3>마스터 주문 입력</h3>
-        <label>자리 번호:</label>
-        <select id="master-seat" style="padding:5px;">
-          {% for num in range(1, 13) %}
-            <option value="{{ num }}">{{ num }}번</option>
-          {% endfor %}
-        </select><br/>
-            <label>소금 선택:</label>
-            <select id="master-salt" style="padding:5px;">
-                <option value="라벤더">라벤더</option>
-                <option value="스피아민트">스피아민트</option>
-                <option value="히말라야">히말라야</option>
-            </select><br/>
-            <label>음료 선택:</label>
-            <select id="master-drink" style="padding:5px;">
-            <option value="아메리카노(HOT)">아메리카노(HOT) / 美式咖啡 (热)</option>
-            <option value="아메리카노(COLD)">아메리카노(COLD) / 美式咖啡 (冰)</option>
-            <option value="캐모마일(HOT)">캐모마일(HOT) / 洋甘菊茶 (热)</option>
-            <option value="캐모마일(COLD)">캐모마일(COLD) / 洋甘菊茶 (冰)</option>
-            <option value="페퍼민트(HOT)">페퍼민트(HOT) / 薄荷茶 (热)</option>
-            <option value="페퍼민트(COLD)">페퍼민트(COLD) / 薄荷茶 (冰)</option>
-            <option value="루이보스(HOT)">루이보스(HOT) / 南非红茶 (热)</option>
-            <option value="루이보스(COLD)">루이보스(COLD) / 南非红茶 (冰)</option>
-            <option value="얼그레이(HOT)">얼그레이(HOT) / 伯爵茶 (热)</option>
-            <option value="얼그레이(COLD)">얼그레이(COLD) / 伯爵茶 (冰)</option>
-            <option value="핫초코(Only HOT)">핫초코(Only HOT) / 热巧克力</option>
-            <option value="아이스티(Only ICE)">아이스티(Only ICE) / 冰茶</option>
-            <option value="사과주스(Only ICE)">사과주스(Only ICE) / 苹果汁</option>
-            <option value="오렌지주스(Only ICE)">오렌지주스(Only ICE) / 橙汁</option>
-            </select><br/>
-            <button onclick="submitMasterOrder()" style="margin-top:10px;">주문 등록</button>
-        </div>
-    </body>
-    </html>
-    ''', orders=orders, range=range)
-
-# 개별 주문 삭제 API
+    return cached_page("admin", menu().version,
+                       store_key=stores.current().key, root=request.script_root)
+
+# 관리자 화면용 주문 변경분 API
+# since 이후 추가/변경된 주문만 돌려주므로 폴링 비용이 전체 주문 수가 아니라 변경 건수에 비례함
+@app.route("/api/orders")
+def api_orders():
+    since = request.args.get("since", 0, type=int)
+    cursor, reset, changed = get_storage().changes(since)
+    current = menu()
+    return jsonify({"cursor": cursor, "reset": reset,
+                    "orders": [current.describe(order) for order in changed]})
+
+# 주문 하나의 이벤트 이력 (접수, 상태/자리/메뉴 변경, 이력 테이블 이동) - 분쟁 확인용
+@app.route("/api/orders/<int:order_id>/events")
+def api_order_events(order_id):
+    events = get_storage().order_events(order_id)
+    if not events:
+        return jsonify({"error": "주문을 찾을 수 없습니다."}), 404
+    current = menu()
+    return jsonify({"id": order_id, "events": [current.describe(event) for event in events]})
+
+# 메뉴 카탈로그 API (버전을 ETag 로 사용)
+@app.route("/api/menu")
+def api_menu():
+    current = menu()
+    response = jsonify(current.to_json())
+    response.set_etag(f"menu-{current.version}")
+    return response.make_conditional(request)
+
+# 메뉴 품절/판매 재개 API
+@app.route("/admin/menu-availability", methods=["POST"])
+def menu_availability():
+    data = request.json
+    item_id = data.get("id")
+    if not order_store.valid_ids([item_id]):
+        return jsonify({"error": "유효한 메뉴 ID가 없습니다."}), 400
+    if not get_storage().set_available(item_id, bool(data.get("available"))):
+        return jsonify({"error": "메뉴를 찾을 수 없습니다."}), 404
+    return jsonify({"message": "메뉴 상태가 변경되었습니다."})
+
+# 주방/바 스테이션 대기열 (준비 중 + 대기 중 티켓, 예상 시간 포함)
+@app.route("/api/kitchen/<station>")
+def kitchen_queue(station):
+    if station not in config.KITCHEN_STATIONS:
+        return jsonify({"error": "알 수 없는 스테이션입니다."}), 404
+    store, current = stores.current(), menu()
+    store.storage.refresh_kitchen(store.kitchen, current)
+    return jsonify(store.kitchen.station_view(station, current))
+
+# 스테이션이 다음 티켓을 가져감 (대기 중 -> 준비 중)
+@app.route("/api/kitchen/<station>/claim", methods=["POST"])
+def kitchen_claim(station):
+    if station not in config.KITCHEN_STATIONS:
+        return jsonify({"error": "알 수 없는 스테이션입니다."}), 404
+    store, current = stores.current(), menu()
+    ticket = store.storage.claim_ticket(store.kitchen, station, current)
+    if ticket is None:
+        return jsonify({"ticket": None})
+    store.broker.publish("order-status", {"id": ticket.id, "status": ticket.status})
+    return jsonify({"ticket": ticket.to_json(current, ticket.prep_seconds)})
+
+# 스테이션이 티켓을 완료 (준비 중 -> 서빙 완료)
+@app.route("/api/kitchen/tickets/<int:order_id>/complete", methods=["POST"])
+def kitchen_complete(order_id):
+    try:
+        found = get_storage().set_status(order_id, order_store.STATUS_SERVED)
+    except order_store.InvalidTransition as e:
+        return jsonify({"error": f"변경할 수 없는 상태입니다. ({e})"}), 409
+    if not found:
+        return jsonify({"error": "주문을 찾을 수 없습니다."}), 404
+    stores.current().broker.publish("order-status", {"id": order_id, "status": order_store.STATUS_SERVED})
+    return jsonify({"message": "주문이 완료되었습니다."})
+
+# 손님 화면용 예상 대기 시간 (주문 완료 페이지는 캐시된 그대로 두고 이 값만 따로 가져감)
+@app.route("/api/wait")
+def api_wait():
+    seat = request.args.get("seat", "1")
+    store = stores.current()
+    store.storage.refresh_kitchen(store.kitchen, menu())
+    wait = store.kitchen.seat_wait(seat)
+    return jsonify({"seat": seat, "wait_seconds": None if wait is None else int(wait)})
+
+# 통계 조회 기간 (?start=YYYY-MM-DD&end=YYYY-MM-DD, 기본은 최근 STATS_DEFAULT_DAYS 일)
+# 잘못된 날짜면 None
+def stats_period():
+    today = stats.local_now().date()
+    try:
+        end = datetime.strptime(request.args["end"], "%Y-%m-%d").date() if "end" in request.args else today
+        start = (datetime.strptime(request.args["start"], "%Y-%m-%d").date() if "start" in request.args
+                 else end - timedelta(days=config.STATS_DEFAULT_DAYS - 1))
+    except ValueError:
+        return None
+    return start.isoformat(), end.isoformat()
+
+# 판매 통계 페이지 (집계 테이블만 읽음)
+@app.route("/admin/stats")
+def admin_stats():
+    period = stats_period()
+    if period is None:
+        return jsonify({"error": "날짜는 YYYY-MM-DD 형식으로 입력해주세요."}), 400
+    summary = get_storage().stats_report(*period)
+    return render_page("stats", start=period[0], end=period[1], summary=summary,
+                       root=request.script_root)
+
+# 판매 통계 CSV 내보내기 (?by=day 또는 ?by=hour)
+@app.route("/admin/stats.csv")
+def admin_stats_csv():
+    period = stats_period()
+    if period is None:
+        return jsonify({"error": "날짜는 YYYY-MM-DD 형식으로 입력해주세요."}), 400
+    by = "hour" if request.args.get("by") == "hour" else "day"
+    body = get_storage().stats_csv(*period, menu(), by=by)
+    filename = f"stats-{stores.current().key}-{by}-{period[0]}-{period[1]}.csv"
+    return Response(body, mimetype="text/csv",
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+# 좌석 QR 코드에 넣을 주문 주소 (서명 포함)
+def seat_url(seat):
+    base = (config.PUBLIC_BASE_URL or request.host_url).rstrip("/")
+    query = urlencode({"seat": seat, "t": seatlink.token(stores.current().key, seat)})
+    return f"{base}{request.script_root}/order?{query}"
+
+# 좌석 QR 코드 이미지 (SVG/PNG), 이미지 내용 해시를 ETag 로 사용
+@app.route("/admin/qr/<seat>.<any(svg, png):fmt>")
+def seat_qr(seat, fmt):
+    if not seatlink.has_seat(stores.current(), seat):
+        return jsonify({"error": "없는 좌석입니다."}), 404
+    try:
+        image = qrimages.images.get(seat_url(seat), fmt)
+    except qrimages.QRUnavailable as e:
+        return jsonify({"error": str(e)}), 501
+    response = Response(image.body, mimetype=image.mimetype, headers={"Cache-Control": "no-cache"})
+    response.set_etag(image.etag)
+    return response.make_conditional(request)
+
+# 매장 좌석 전체 QR 코드 인쇄용 시트 (좌석 배치가 바뀌면 이 페이지에서 다시 인쇄)
+@app.route("/admin/qr-sheet")
+def qr_sheet():
+    try:
+        cards = [(seat, qrimages.images.get(seat_url(seat), "svg").inline()) for seat in stores.current().seats]
+    except qrimages.QRUnavailable as e:
+        return jsonify({"error": str(e)}), 501
+    return render_page("qr_sheet", cards=cards, root=request.script_root)
+
+# 관리자 화면용 실시간 주문 이벤트 (Server-Sent Events)
+# 요청이 끝난 뒤에도 스트림이 열려 있는 동안은 매장을 닫지 않음 (닫히면 다시 연 매장의 브로커를 못 받음)
+@app.route("/admin/events")
+def admin_events():
+    store = stores.current()
+    stores.registry.retain(store)
+    body = ClosingIterator(stream(store.broker), lambda: stores.registry.release(store))
+    return Response(body, mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# 주문 상태 변경 API (대기 중 -> 준비 중 -> 서빙 완료)
+@app.route("/order-status", methods=["POST"])
+def order_status():
+    data = request.json
+    order_id = data.get("id")
+    status = data.get("status")
+    if not order_store.valid_ids([order_id]) or status not in order_store.TRANSITIONS:
+        return jsonify({"error": "유효한 주문 ID와 상태가 필요합니다."}), 400
+    try:
+        found = get_storage().set_status(order_id, status)
+    except order_store.InvalidTransition as e:
+        return jsonify({"error": f"변경할 수 없는 상태입니다. ({e})"}), 409
+    if not found:
+        return jsonify({"error": "주문을 찾을 수 없습니다."}), 404
+    stores.current().broker.publish("order-status", {"id": order_id, "status": status})
+    return jsonify({"message": "주문 상태가 변경되었습니다."})
+
+# 개별 주문 삭제 API (기록은 남기고 서빙 완료 처리만 함)
 @app.route("/delete-order", methods=["POST"])
 def delete_order():
     order_id = request.json.get("id")
-    if order_id:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM orders WHERE id=?", (order_id,))
-        conn.commit()
-        conn.close()
+    if order_store.valid_ids([order_id]):
+        found = get_storage().set_status(order_id, order_store.STATUS_SERVED)
+        if found:
+            stores.current().broker.publish("order-status", {"id": order_id, "status": order_store.STATUS_SERVED})
         return jsonify({"message": "주문이 삭제되었습니다."})
     return jsonify({"error": "유효한 주문 ID가 없습니다."}), 400
 
-# 모든 주문 삭제 API
+# 모든 주문 삭제 API (진행 중인 주문을 모두 서빙 완료 처리)
 @app.route("/delete-all-orders", methods=["POST"])
 def delete_all_orders():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM orders")
-    conn.commit()
-    conn.close()
+    get_storage().serve_all()
+    stores.current().broker.publish("orders-cleared")
     return jsonify({"message": "모든 주문이 삭제되었습니다."})
 
+# 관리자 일괄 작업 API: 여러 작업을 한 트랜잭션에서 처리하고 응답도 한 번만 보냄
+# {"operations": [{"op": "serve", "ids": [1, 2]}, {"op": "move", "ids": [3], "seat": "5"},
+#                 {"op": "edit", "ids": [4], "salt": 1, "drink": 5}, {"op": "clear_seat", "seat": "7"}]}
+@app.route("/admin/bulk", methods=["POST"])
+def admin_bulk():
+    operations = (request.json or {}).get("operations")
+    if not isinstance(operations, list) or not operations or not all(isinstance(op, dict) for op in operations):
+        return jsonify({"error": "operations 목록이 필요합니다."}), 400
+    if not all(order_store.valid_ids(op.get("ids", [])) for op in operations):
+        return jsonify({"error": "ids 는 주문 ID(정수) 목록이어야 합니다."}), 400
+    if sum(len(op.get("ids", [])) for op in operations) > config.BULK_MAX_IDS:
+        return jsonify({"error": f"한 번에 최대 {config.BULK_MAX_IDS}개 주문까지 처리할 수 있습니다."}), 400
+    try:
+        changed = get_storage().bulk(operations, menu().resolve, {str(seat) for seat in stores.current().seats})
+    except order_store.BulkError as e:
+        return jsonify({"error": str(e), "index": e.index}), 409
+    if changed:
+        stores.current().broker.publish("orders-bulk", {"ids": changed})
+    return jsonify({"message": f"{len(changed)}건의 주문을 처리했습니다.", "changed": changed})
+
 # 마스터 주문 입력 API (관리자가 수동으로 주문)
 @app.route("/master-order", methods=["POST"])
 def master_order():
     data = request.json
     seat = data.get("seat")
-    salt = data.get("saltType")
-    drink = data.get("drink")
-
-    if seat and salt and drink:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO orders (seat, salt, drink)
-            VALUES (?, ?, ?)
-        """, (seat, salt, drink))
-        conn.commit()
-        conn.close()
-        return jsonify({"message": f"{seat}번 자리에 마스터 주문이 등록되었습니다."})
+
+    if seat and data.get("saltType") and data.get("drink"):
+        message = {"message": f"{seat}번 자리에 마스터 주문이 등록되었습니다."}
+        key, error = request_key(data)
+        if error:
+            return error
+        if existing_order(key) is not None:
+            return jsonify(message), 200, {"Idempotent-Replayed": "true"}
+        salt, drink, error = resolve_menu_items(data)
+        if error:
+            return error
+        place_order(seat, salt, drink, key)
+        return jsonify(message)
     return jsonify({"error": "모든 필드를 입력해주세요."}), 400
 
-#크롤러 허용 설정
+# 손님 화면용 서비스 워커 (매장 경로 전체를 범위로 쓰도록 /sw.js 로 제공)
+# 미리 캐시할 파일 목록이 바뀌면 내용도 바뀌므로 브라우저가 새 서비스 워커를 설치함
+@app.route("/sw.js")
+def service_worker():
+    if not config.OFFLINE_ORDERING:
+        return "", 404
+    asset_url = app.jinja_env.globals["asset_url"]
+    precache = [asset_url(name) for name in
+                ("css/customer.css", "js/offline.js", "js/order.js", "js/order_complete.js", "logo.png")]
+    precache.append(url_for("api_menu"))
+    version = hashlib.md5("\n".join(precache).encode()).hexdigest()[:8]
+    response = Response(render_page("sw", root=request.script_root, version=version, precache=precache),
+                        mimetype="application/javascript")
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+# 상태 확인
+# /healthz: 프로세스가 응답하는지만 확인 (DB 를 건드리지 않음)
+# /readyz : 워커 준비가 끝났고 열려 있는 매장 DB 에 접근되는지 (아니면 503, 로드 밸런서가 트래픽을 보내지 않음)
+@app.route("/healthz")
+def healthz():
+    return jsonify({"status": "ok", "pid": os.getpid()})
+
+@app.route("/readyz")
+def readyz():
+    open_stores = stores.registry.open_stores()
+    body = {"ready": ready_pid == os.getpid(), "pid": os.getpid(), "warm_seconds": warm_seconds,
+            "stores": [store.key for store in open_stores], "cached_pages": len(pages.page_cache)}
+    try:
+        for store in open_stores:
+            store.db.query_one("SELECT 1")
+    except Exception as e:
+        body.update(ready=False, error=str(e))
+    return jsonify(body), 200 if body["ready"] else 503
+
+#크롤러 허용 설정 (광고가 있는 손님 페이지는 허용, 관리자 화면과 API 는 제외)
 @app.route("/robots.txt")
 def robots():
-	return "User-agent: *\nDisallow:", 200, {"Content-Type" : "text/plain"}
+	return "User-agent: *\nDisallow: /admin\nDisallow: /api/\nDisallow: /s/*/admin\nDisallow: /s/*/api/\n", 200, {"Content-Type" : "text/plain"}
+
+# 라우트를 모두 등록한 뒤에 시작 준비
+warm_up()
 
 # Flask 서버 실행
 if __name__ == "__main__":
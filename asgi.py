@@ -0,0 +1,169 @@
+# 비동기(ASGI) 실행 모드
+#   uvicorn asgi:application --workers 2
+#
+# 동시 접속이 많은 경로는 이벤트 루프에서 직접 처리하고 (스레드/워커를 점유하지 않음)
+#   - GET /order, /order-complete, /admin : 렌더 캐시에 있으면 바로 응답
+#   - GET /api/orders                    : 비동기 DB 계층으로 변경분 조회
+#   - GET /admin/events                  : 비동기 SSE 스트림
+# 그 외 요청(캐시 미스 포함)은 기존 Flask 앱으로 넘김 (asgiref 스레드 풀에서 실행)
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+import catalog
+import config
+import order_store
+import seatlink
+import stores
+from app import app, prepare_worker
+from events import astream
+from pages import page_cache, page_key
+
+flask_app = WsgiToAsgi(app)
+
+
+def _query(scope):
+    return {k: v[0] for k, v in parse_qs(scope["query_string"].decode("latin-1")).items()}
+
+
+def _header(scope, name):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+def _etag_matches(scope, etag):
+    header = _header(scope, b"if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or f'"{etag}"' in tags
+
+
+async def _respond(send, status, headers, body):
+    headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+    headers.append((b"content-length", str(len(body)).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+# 캐시 가능한 페이지: 경로 -> (페이지 이름, 쿼리에서 템플릿 변수 만들기, max-age)
+# 템플릿 변수는 app.py 의 cached_page() 호출과 같아야 같은 캐시 항목을 찾음
+CACHED_PAGES = {
+    "/order": ("order", lambda q: {"seat_number": q.get("seat", "1")}, lambda: config.ORDER_PAGE_MAX_AGE),
+    "/order-complete": ("order_complete", lambda q: {"seat_number": q.get("seat", "1")},
+                        lambda: config.ORDER_PAGE_MAX_AGE),
+    "/admin": ("admin", lambda q: {}, lambda: 0),
+}
+
+
+# 메뉴 버전 확인이 필요할 때만 스레드 풀에서 DB 를 읽음 (평소에는 메모리 값 사용)
+async def current_menu(store):
+    if catalog.catalogs.is_fresh(store.db):
+        return catalog.catalogs.peek(store.db)
+    return await asyncio.get_running_loop().run_in_executor(None, catalog.catalogs.get, store.db)
+
+
+async def cached_page(scope, receive, send, store, path, prefix):
+    name, make_context, max_age = CACHED_PAGES[path]
+    query = _query(scope)
+    # 잘못된 좌석 링크는 캐시를 찾기 전에 Flask 로 넘겨 403 으로 응답 (app.check_seat_link)
+    seat = query.get("seat", "1")
+    if path == "/order" and seatlink.check(store, seat, query.get("t")) is not None:
+        return await flask_app(scope, receive, send)
+    if path == "/order-complete" and not seatlink.has_seat(store, seat):
+        return await flask_app(scope, receive, send)
+    menu = await current_menu(store)
+    context = dict(make_context(query), store_key=store.key,
+                   root=scope.get("root_path", "") + prefix)
+    # 매장별 캐시에서 메뉴 버전으로 찾으므로 다른 매장의 메뉴 변경이 이 매장 캐시를 비우지 않음
+    entry = page_cache.get(store.key, page_key(name, context), menu.version)
+    if entry is None:
+        # 처음 요청은 Flask 가 렌더링하면서 캐시를 채움
+        return await flask_app(scope, receive, send)
+    status, headers, body = entry.respond(
+        lambda etag: _etag_matches(scope, etag),
+        "gzip" in _header(scope, b"accept-encoding"),
+        max_age(),
+    )
+    await _respond(send, status, headers, body)
+
+
+async def api_orders(scope, receive, send, store, path, prefix):
+    try:
+        since = int(_query(scope).get("since", 0))
+    except ValueError:
+        since = 0
+    cursor, reset, changed = await store.async_db.read(lambda conn: order_store.changes_since(conn, since))
+    menu = await current_menu(store)
+    body = json.dumps({"cursor": cursor, "reset": reset,
+                       "orders": [menu.describe(order) for order in changed]}).encode()
+    await _respond(send, 200, [("Content-Type", "application/json")], body)
+
+
+async def admin_events(scope, receive, send, store, path, prefix):
+    await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", b"text/event-stream; charset=utf-8"),
+        (b"cache-control", b"no-cache"),
+        (b"x-accel-buffering", b"no"),
+    ]})
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        async for chunk in astream(store.broker):
+            if disconnected.is_set():
+                break
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+    finally:
+        watcher.cancel()
+
+
+ROUTES = {
+    "/order": cached_page,
+    "/order-complete": cached_page,
+    "/admin": cached_page,
+    "/api/orders": api_orders,
+    "/admin/events": admin_events,
+}
+
+
+async def lifespan(scope, receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # 이 워커의 커넥션/저널 복구/백그라운드 작업을 첫 요청 전에 준비 (/readyz)
+            await asyncio.get_running_loop().run_in_executor(None, prepare_worker)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            # 종료 전에 매장마다 쓰기 큐에 남은 주문을 커밋
+            await asyncio.get_running_loop().run_in_executor(None, stores.registry.close_all)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(scope, receive, send)
+    if scope["type"] != "http" or scope["method"] != "GET":
+        return await flask_app(scope, receive, send)
+    # 매장 구분은 WSGI 쪽(StoreMiddleware)과 같은 규칙을 사용
+    key, prefix = stores.resolve(_header(scope, b"host"), scope["path"])
+    path = scope["path"][len(prefix):] or "/"
+    handler = ROUTES.get(path)
+    store = stores.registry.get(key, retain=True) if handler is not None else None
+    if store is None:
+        return await flask_app(scope, receive, send)
+    # 응답(SSE 스트림 포함)이 끝날 때까지 매장을 닫지 않음
+    try:
+        await handler(scope, receive, send, store, path, prefix)
+    finally:
+        stores.registry.release(store)
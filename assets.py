@@ -0,0 +1,92 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import Response, abort, request, url_for
+
+try:
+    import brotli
+except ImportError:  # brotli 는 선택 사항 (없으면 gzip 만 제공)
+    brotli = None
+
+COMPRESSIBLE = {".css", ".js", ".json", ".svg", ".txt", ".html", ".webmanifest"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def asset_etag(digest, encoding):
+    return digest if encoding == "identity" else f"{digest}-{encoding}"
+
+
+class Asset:
+    __slots__ = ("name", "digest", "mimetype", "variants")
+
+    def __init__(self, name, digest, mimetype, variants):
+        self.name = name
+        self.digest = digest
+        self.mimetype = mimetype
+        self.variants = variants  # {"identity": bytes, "gzip": bytes, "br": bytes}
+
+
+# 정적 파일을 시작 시 한 번 읽어서 내용 해시로 파일명을 붙이고 (css/customer.3fa2b1c9.css)
+# gzip/brotli 로 미리 압축해 메모리에 보관함. 파일명이 내용에 따라 바뀌므로 1년 캐시해도 안전
+class AssetRegistry:
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}  # 해시가 붙은 파일명 -> Asset
+        self.urls = {}    # 원래 파일명 -> 해시가 붙은 파일명
+
+    def load(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    self.add(name, f.read())
+        return self
+
+    def add(self, name, data):
+        digest = hashlib.md5(data).hexdigest()[:8]
+        base, ext = os.path.splitext(name)
+        fingerprinted = f"{base}.{digest}{ext}"
+        variants = {"identity": data}
+        if ext in COMPRESSIBLE:
+            variants["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                variants["br"] = brotli.compress(data, quality=11)
+        mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.assets[fingerprinted] = Asset(fingerprinted, digest, mimetype, variants)
+        self.urls[name] = fingerprinted
+
+    def url(self, name):
+        fingerprinted = self.urls.get(name)
+        if fingerprinted is None:
+            return url_for("static", filename=name)
+        return url_for("asset", filename=fingerprinted)
+
+    # 압축 방식마다 본문이 다르므로 strong ETag 도 다르게 붙임 (<해시>, <해시>-gzip, <해시>-br)
+    # If-None-Match 는 같은 파일의 어느 변형이든 맞으면 304
+    def response(self, filename):
+        asset = self.assets.get(filename)
+        if asset is None:
+            abort(404)
+        encoding = request.accept_encodings.best_match(
+            [e for e in ("br", "gzip") if e in asset.variants]) or "identity"
+        if any(asset_etag(asset.digest, e) in request.if_none_match for e in asset.variants):
+            response = Response(status=304)
+        else:
+            response = Response(asset.variants[encoding], mimetype=asset.mimetype)
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(asset_etag(asset.digest, encoding))
+        response.headers["Cache-Control"] = IMMUTABLE
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+def init_app(app):
+    registry = AssetRegistry(app.static_folder).load()
+    app.extensions["assets"] = registry
+    app.jinja_env.globals["asset_url"] = registry.url
+    app.add_url_rule("/assets/<path:filename>", "asset", registry.response)
+    return registry
@@ -0,0 +1,2 @@
+# 주문 흐름 부하 테스트 / 벤치마크
+#   python -m bench --help
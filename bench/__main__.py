@@ -0,0 +1,82 @@
+import argparse
+import json
+import sys
+
+import config
+from bench.load import run_load
+from bench.server import BenchServer, seed_orders
+
+
+def print_report(report):
+    print(f"전체 처리량: {report['throughput']} req/s ({report['elapsed']}s)")
+    print(f"{'route':<22}{'req':>8}{'err':>6}{'req/s':>10}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for route, stats in report["routes"].items():
+        print(f"{route:<22}{stats['requests']:>8}{stats['errors']:>6}{stats['throughput']:>10}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}")
+
+
+# 기준 결과와 비교해서 p95 지연이나 처리량이 허용치보다 나빠진 경로 목록을 돌려줌
+def compare(report, baseline, tolerance):
+    regressions = []
+    for route, base in baseline["routes"].items():
+        current = report["routes"].get(route)
+        if current is None:
+            continue
+        if base["p95_ms"] and current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {base['p95_ms']}ms -> {current['p95_ms']}ms")
+        if base["throughput"] and current["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{route}: {base['throughput']} -> {current['throughput']} req/s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="QR 주문 흐름 벤치마크")
+    parser.add_argument("--url", help="이미 떠 있는 서버 주소 (없으면 임시 DB 로 앱을 직접 띄움)")
+    parser.add_argument("--orders", type=int, default=10000, help="미리 넣어 둘 과거 주문 수")
+    parser.add_argument("--duration", type=float, default=10.0, help="측정 시간(초)")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 클라이언트 수")
+    parser.add_argument("--seats", type=int, default=12)
+    parser.add_argument("--output", help="결과를 JSON 으로 저장할 경로")
+    parser.add_argument("--baseline", help="비교할 기준 결과 JSON (회귀 모드)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="회귀로 보지 않는 허용 비율")
+    parser.add_argument("--storage", choices=("sqlite", "memory"), help="앱을 직접 띄울 때 저장 엔진")
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if url is None:
+        server = BenchServer(storage=args.storage)
+        url = server.start()
+        import stores
+        seed_orders(stores.registry.default().db, args.orders, seats=args.seats)
+        print(f"임시 DB {config.DB_FILE} ({config.STORAGE_ENGINE}) 에 과거 주문 {args.orders}건을 넣고 {url} 에서 실행합니다.")
+
+    try:
+        report = run_load(url, args.duration, args.concurrency, args.seats)
+    finally:
+        if server is not None:
+            server.stop()
+    report["params"] = {"orders": args.orders, "duration": args.duration,
+                        "concurrency": args.concurrency, "seats": args.seats,
+                        "storage": config.STORAGE_ENGINE}
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("성능 회귀:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("기준 결과 대비 회귀 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
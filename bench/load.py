@@ -0,0 +1,152 @@
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from bench.server import DRINKS, SALTS
+
+# 실제 매장 트래픽 비율을 흉내낸 시나리오 (이름, 가중치)
+# - scan: QR 스캔으로 주문 페이지 열기 (절반은 브라우저 캐시 ETag 재검증)
+# - order: 손님 주문 + 완료 페이지
+# - admin_poll: 관리자 태블릿의 변경분 폴링
+# - master_order: 관리자가 직접 입력하는 주문
+SCENARIOS = [
+    ("scan", 50),
+    ("order", 20),
+    ("admin_poll", 25),
+    ("master_order", 5),
+]
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Client:
+    def __init__(self, base_url, rng, seats):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.rng = rng
+        self.seats = seats
+        self.conn = None
+        self.etags = {}
+        self.cursor = 0
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                if response.getheader("Connection", "").lower() == "close" or response.version == 10:
+                    self.conn.close()
+                    self.conn = None
+                return response, data
+            except (http.client.HTTPException, ConnectionError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+    def seat(self):
+        return self.rng.randint(1, self.seats)
+
+    def scan(self, record):
+        path = f"/order?seat={self.seat()}"
+        headers = {"Accept-Encoding": "gzip"}
+        if path in self.etags and self.rng.random() < 0.5:
+            headers["If-None-Match"] = self.etags[path]
+        response, _ = record("GET /order", self.request, "GET", path, headers=headers)
+        if response.getheader("ETag"):
+            self.etags[path] = response.getheader("ETag")
+
+    def order(self, record):
+        seat = self.seat()
+        body = {"saltType": self.rng.choice(SALTS), "drink": self.rng.choice(DRINKS)}
+        record("POST /order", self.request, "POST", f"/order?seat={seat}", body=body)
+        record("GET /order-complete", self.request, "GET", f"/order-complete?seat={seat}",
+               headers={"Accept-Encoding": "gzip"})
+
+    def admin_poll(self, record):
+        _, data = record("GET /api/orders", self.request, "GET", f"/api/orders?since={self.cursor}")
+        try:
+            self.cursor = json.loads(data)["cursor"]
+        except (ValueError, KeyError):
+            self.cursor = 0
+
+    def master_order(self, record):
+        body = {"seat": str(self.seat()), "saltType": self.rng.choice(SALTS),
+                "drink": self.rng.choice(DRINKS)}
+        record("POST /master-order", self.request, "POST", "/master-order", body=body)
+
+
+# concurrency 개의 스레드가 duration 초 동안 시나리오를 무작위로 실행하고
+# 경로별 지연 시간을 모아서 돌려줌
+def run_load(base_url, duration=10.0, concurrency=8, seats=12, seed=42):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    names = [name for name, _ in SCENARIOS]
+    weights = [weight for _, weight in SCENARIOS]
+    deadline = time.monotonic() + duration
+
+    def record(route, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            response, data = fn(*args, **kwargs)
+        except Exception:
+            with lock:
+                errors[route] += 1
+            raise
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies[route].append(elapsed)
+            if response.status >= 400:
+                errors[route] += 1
+        return response, data
+
+    def worker(index):
+        client = Client(base_url, random.Random(seed + index), seats)
+        while time.monotonic() < deadline:
+            scenario = client.rng.choices(names, weights)[0]
+            try:
+                getattr(client, scenario)(record)
+            except Exception:
+                pass
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    return summarize(latencies, errors, elapsed)
+
+
+def summarize(latencies, errors, elapsed):
+    routes = {}
+    for route in sorted(set(latencies) | set(errors)):
+        values = sorted(latencies.get(route, []))
+        routes[route] = {
+            "requests": len(values),
+            "errors": errors.get(route, 0),
+            "throughput": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+        }
+    total = sum(route["requests"] for route in routes.values())
+    return {"elapsed": round(elapsed, 2), "throughput": round(total / elapsed, 2), "routes": routes}
@@ -0,0 +1,78 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+
+import config
+
+SALTS = ["라벤더", "스피아민트", "히말라야"]
+DRINKS = ["아메리카노(HOT)", "아메리카노(COLD)", "캐모마일(HOT)", "페퍼민트(COLD)",
+          "루이보스(HOT)", "얼그레이(COLD)", "핫초코(Only HOT)", "아이스티(Only ICE)"]
+
+
+# 임시 SQLite 파일(또는 메모리 엔진)을 쓰는 앱을 현재 프로세스 안에서 띄움
+# config.DB_FILE 을 바꾼 뒤에 app 을 import 해야 하므로 import 는 함수 안에서 함
+class BenchServer:
+    def __init__(self, host="127.0.0.1", port=0, storage=None):
+        self.tmpdir = tempfile.mkdtemp(prefix="qr-bench-")
+        config.DB_FILE = os.path.join(self.tmpdir, "bench.db")
+        config.MEMORY_SNAPSHOT_DIR = os.path.join(self.tmpdir, "snapshots")
+        config.JOURNAL_DIR = os.path.join(self.tmpdir, "journal")
+        config.SEAT_LINK_SECRET_FILE = os.path.join(self.tmpdir, "seat_link.key")
+        if storage:
+            config.STORAGE_ENGINE = storage
+        config.ARCHIVE_INTERVAL_SECONDS = 0
+        # 부하 생성기는 IP 하나에서 모든 주문을 보내므로 요청 제한은 끔
+        config.RATE_LIMIT_ENABLED = False
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        from app import app
+
+        class QuietHandler(WSGIRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self._server = make_server(self.host, self.port, app, threaded=True,
+                                   request_handler=QuietHandler)
+        self.port = self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return f"http://{self.host}:{self.port}"
+
+    # 서버를 멈추고 매장 DB 를 닫은 뒤 임시 디렉터리(DB, 저널, 스냅샷)를 지움
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            import stores
+            stores.registry.close_all()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+# 과거 주문 N 건을 직접 넣음 (대부분 서빙 완료, 일부는 진행 중)
+# db 는 앱이 쓰는 Database (메모리 엔진이면 같은 프로세스 안에서만 보이므로 파일을 직접 열지 않음)
+def seed_orders(db, count, seats=12, active_ratio=0.02):
+    rng = random.Random(1234)
+    with db.transaction() as conn:
+        menu_ids = {row["code"]: row["id"] for row in conn.execute(
+            "SELECT code, id FROM menu_items WHERE retired = 0")}
+        salt_ids = [menu_ids[code] for code in SALTS]
+        drink_ids = [menu_ids[code] for code in DRINKS]
+        conn.executemany("""
+            INSERT INTO orders (seat, salt_id, drink_id, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, datetime('now', ?), datetime('now', ?))
+        """, (
+            (str(rng.randint(1, seats)), rng.choice(salt_ids), rng.choice(drink_ids),
+             "대기 중" if rng.random() < active_ratio else "서빙 완료",
+             f"-{count - i} minutes", f"-{count - i} minutes")
+            for i in range(count)
+        ))
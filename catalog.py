@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import namedtuple
+
+import config
+
+MenuItem = namedtuple("MenuItem", (
+    "id", "kind", "code", "label_ko", "label_en", "label_zh",
+    "temperature", "sort_order", "available", "retired", "station", "prep_seconds",
+))
+
+
+# 메뉴 한 벌 (읽기 전용 스냅샷)
+class Catalog:
+    def __init__(self, version, items):
+        self.version = version
+        self.items = {item.id: item for item in items}
+        self.by_code = {(item.kind, item.code): item for item in items}
+        listed = sorted((item for item in items if not item.retired), key=lambda i: (i.sort_order, i.id))
+        self.salts = [item for item in listed if item.kind == "salt"]
+        self.drinks = [item for item in listed if item.kind == "drink"]
+
+    # 메뉴 id(정수/숫자 문자열) 또는 예전 방식의 문자열 코드로 항목을 찾음 (그 밖의 JSON 값은 None)
+    def resolve(self, kind, value):
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            return None
+        try:
+            item = self.items.get(int(value))
+        except (TypeError, ValueError):
+            item = self.by_code.get((kind, value))
+        if item is None or item.kind != kind:
+            return None
+        return item
+
+    def label(self, item_id):
+        item = self.items.get(item_id)
+        return item.code if item is not None else str(item_id)
+
+    # 주문 dict 에 화면 표시용 메뉴 이름을 붙임
+    def describe(self, order):
+        order = dict(order)
+        order["salt"] = self.label(order["salt_id"])
+        order["drink"] = self.label(order["drink_id"])
+        return order
+
+    def to_json(self):
+        return {"version": self.version, "items": [item._asdict() for item in self.items.values()]}
+
+
+def load(conn):
+    version = conn.execute("SELECT version FROM menu_meta WHERE id = 1").fetchone()[0]
+    rows = conn.execute("""
+        SELECT id, kind, code, label_ko, label_en, label_zh, temperature, sort_order, available, retired,
+               station, prep_seconds
+        FROM menu_items
+    """).fetchall()
+    return Catalog(version, [MenuItem(*row) for row in rows])
+
+
+# 워커마다 메뉴를 메모리에 들고 있다가, CATALOG_CHECK_SECONDS 마다 한 번만 버전을 확인함
+# (페이지 렌더링/주문마다 메뉴 테이블을 읽지 않음)
+class CatalogCache:
+    def __init__(self, check_seconds=None):
+        self.check_seconds = check_seconds if check_seconds is not None else config.CATALOG_CHECK_SECONDS
+        self._lock = threading.Lock()
+        self._entries = {}  # db 경로 -> (Catalog, 마지막 확인 시각)
+
+    def is_fresh(self, db):
+        entry = self._entries.get(db.path)
+        return entry is not None and time.monotonic() - entry[1] < self.check_seconds
+
+    def peek(self, db):
+        entry = self._entries.get(db.path)
+        return entry[0] if entry is not None else None
+
+    def get(self, db):
+        entry = self._entries.get(db.path)
+        now = time.monotonic()
+        if entry is not None and now - entry[1] < self.check_seconds:
+            return entry[0]
+        with self._lock:
+            entry = self._entries.get(db.path)
+            with db.connection() as conn:
+                version = conn.execute("SELECT version FROM menu_meta WHERE id = 1").fetchone()[0]
+                if entry is None or entry[0].version != version:
+                    catalog = load(conn)
+                else:
+                    catalog = entry[0]
+            self._entries[db.path] = (catalog, now)
+            return catalog
+
+    def invalidate(self, db):
+        with self._lock:
+            self._entries.pop(db.path, None)
+
+
+catalogs = CatalogCache()
+
+
+def set_available(conn, item_id, available):
+    return conn.execute("UPDATE menu_items SET available=? WHERE id=?",
+                        (1 if available else 0, item_id)).rowcount > 0
@@ -1,2 +1,112 @@
+import os
+
 DB_FILE = "app.db"
-DEBUG = True
\ No newline at end of file
+DEBUG = True
+
+# SQLite 커넥션 풀 설정 (워커 프로세스마다 별도 풀)
+DB_POOL_SIZE = 8
+DB_BUSY_TIMEOUT_MS = 5000
+DB_SYNCHRONOUS = "NORMAL"  # WAL 모드에서는 NORMAL 이면 충분히 안전함
+DB_CACHED_STATEMENTS = 128
+
+# 주문 페이지 렌더 캐시 (메뉴 버전이 바뀌면 자동으로 비워짐)
+PAGE_CACHE_SIZE = 256        # 매장마다 캐시할 최대 페이지 수 (좌석마다 주문/주문 완료 2개 + 관리자 화면)
+ORDER_PAGE_MAX_AGE = 60      # 브라우저 캐시 시간(초), 이후에는 ETag 로 재검증
+
+# 서빙 완료 주문 보관(아카이브) 작업
+ARCHIVE_INTERVAL_SECONDS = 300   # 0 이면 백그라운드 작업을 띄우지 않음
+ARCHIVE_AFTER_MINUTES = 30       # 서빙 완료 후 이 시간이 지나면 이력 테이블로 이동
+
+# 시작 준비: 매장 DB 를 열고(마이그레이션) 메뉴와 좌석별 주문 페이지, 관리자 화면을 미리 캐시
+# gunicorn.conf.py 의 preload 에서는 마스터가 한 번만 하고 워커는 fork 로 물려받음
+WARM_UP_PAGES = True
+
+# 주문 쓰기 그룹 커밋
+WRITE_BATCH_SIZE = 32         # 한 트랜잭션에 묶을 최대 작업 수
+WRITE_BATCH_LATENCY_MS = 3    # 첫 작업 이후 다른 작업을 기다리는 최대 시간
+WRITE_TIMEOUT_SECONDS = 10    # 요청 스레드가 커밋을 기다리는 최대 시간
+
+# 성능 계측 (/metrics). 끄면 요청/DB 에 어떤 훅도 걸리지 않음
+METRICS_ENABLED = False
+SERVER_TIMING = False        # 응답에 Server-Timing 헤더 추가 (브라우저 개발자 도구에서 확인)
+
+# 메뉴 카탈로그: 워커가 메뉴 버전을 다시 확인하는 간격(초)
+CATALOG_CHECK_SECONDS = 5
+
+# 관리자 화면 실시간 이벤트(SSE): 다른 워커에서 생긴 주문 변경을 확인하는 간격(초)
+EVENT_WATCH_SECONDS = 0.5
+
+# 매장(멀티 스토어) 설정
+# 매장은 호스트 이름(hosts) 또는 URL 앞부분(/s/<매장 키>/...)으로 구분하고
+# 매장마다 SQLite 파일을 따로 써서 서로의 쓰기 락에 영향을 주지 않음
+# db_file 이 None 이면 DB_FILE 을 사용
+DEFAULT_STORE = "main"
+STORES = {
+    "main": {
+        "name": "본점",
+        "db_file": None,
+        "hosts": [],
+        # 관리자 화면 좌석 배치: 왼쪽 세로줄(column, 위에서 아래) + 가로줄(row, 왼쪽에서 오른쪽)
+        "layout": {"column": [12, 11, 10, 9], "row": [1, 2, 3, 4, 5, 6, 7, 8]},
+    },
+    # "gangnam": {
+    #     "name": "강남점",
+    #     "db_file": "gangnam.db",
+    #     "hosts": ["gangnam.example.com"],
+    #     "layout": {"column": [6, 5], "row": [1, 2, 3, 4]},
+    # },
+}
+STORE_CACHE_SIZE = 16        # 한 워커가 동시에 열어 둘 매장 DB 최대 개수 (LRU)
+
+# 주문 중복 방지(멱등 키): 같은 키로 다시 들어온 주문은 처음 결과를 그대로 돌려줌
+IDEMPOTENCY_TTL_SECONDS = 600    # 키 보관 시간 (메모리, DB 모두)
+IDEMPOTENCY_CACHE_SIZE = 4096    # 워커 메모리에 둘 최근 키 최대 개수
+
+# 쓰기 요청 제한 (토큰 버킷): 규칙 이름 -> (버킷 크기, 버킷이 다시 가득 차는 데 걸리는 초)
+# order_seat 는 좌석별 주문, order_ip 는 손님 IP 별 주문, admin_ip 는 관리자 화면의 쓰기 요청
+# 매장 와이파이(NAT) 손님은 모두 같은 IP 이므로 order_ip 는 매장 전체 주문량보다 넉넉하게 (한 곳에서 쏟아지는 요청만 막음)
+RATE_LIMIT_ENABLED = True
+RATE_LIMIT_DB_FILE = "ratelimit.db"   # 워커끼리 공유하는 버킷 상태
+RATE_LIMITS = {
+    "order_seat": (5, 60),
+    "order_ip": (300, 60),
+    "admin_ip": (120, 60),
+}
+PROXY_COUNT = int(os.environ.get("PROXY_COUNT", 1))   # 앞단 프록시 수 (Heroku 라우터 1, 프록시 없이 직접 받으면 0) - X-Forwarded-For 로 손님 IP 확인
+
+# 주방/바 준비 대기열
+KITCHEN_STATIONS = {"hot": 1, "cold": 1}   # 스테이션별로 동시에 음료를 만드는 직원 수 (대기 시간 계산용)
+KITCHEN_PREP_WEIGHT = 0.5    # 우선순위 = 주문 시각 + 준비 시간 x 가중치 (클수록 빨리 끝나는 음료를 앞당김)
+KITCHEN_REFRESH_SECONDS = 1  # 손님 대기 시간 조회 시 주문 변경분을 다시 읽는 최소 간격(초)
+
+# 판매 통계
+STATS_UTC_OFFSET_HOURS = 9   # 통계의 시간/날짜 기준 (한국 시간)
+STATS_HOURLY_DAYS = 92       # 시간별 집계 보관 기간(일), 일별 집계는 계속 보관
+STATS_DEFAULT_DAYS = 30      # 통계 화면 기본 조회 기간(일)
+
+# 손님 화면 오프라인 지원 (서비스 워커 캐시 + 주문 대기열)
+OFFLINE_ORDERING = True
+
+# 관리자 일괄 작업 한 번에 처리할 최대 주문 수
+BULK_MAX_IDS = 500
+
+# 저장 엔진: "sqlite" (파일, 기본) 또는 "memory" (메모리 + 주기적 스냅샷, 워커 1개 전용)
+STORAGE_ENGINE = "sqlite"
+MEMORY_SNAPSHOT_DIR = "snapshots"    # 메모리 엔진 스냅샷 파일 위치
+MEMORY_SNAPSHOT_SECONDS = 30         # 스냅샷 간격(초), 0 이면 종료할 때만
+MEMORY_SNAPSHOT_KEEP = 10            # 남겨 둘 스냅샷 개수
+
+# 주문 이벤트 저널 (추가 전용 파일, 매장 DB 파일마다 하나)
+JOURNAL_ENABLED = True
+JOURNAL_DIR = "journal"              # 저널 파일 위치 (<DB 파일 이름>.journal)
+JOURNAL_FLUSH_SECONDS = 0.2          # 이 시간 동안 모인 이벤트를 한 번에 기록하고 fsync
+JOURNAL_RETRY_SECONDS = 5            # 기록에 실패하면 새 주문을 기다리지 않고 이 시간 뒤에 다시 시도
+
+# 좌석 QR 코드 / 서명된 좌석 링크 (/order?seat=N&t=<서명>)
+SEAT_LINK_SECRET = os.environ.get("SEAT_LINK_SECRET", "")   # 비어 있으면 아래 파일에 만들어서 사용
+SEAT_LINK_SECRET_FILE = "instance/seat_link.key"
+SEAT_LINKS_REQUIRED = False  # True 면 서명 없는 예전 링크도 거절 (새 QR 코드를 모두 붙인 뒤 켤 것)
+PUBLIC_BASE_URL = None       # QR 코드에 넣을 주소 (예: "https://order.example.com"), None 이면 관리자 화면 접속 주소
+QR_CACHE_DIR = "qr_cache"    # 렌더링한 QR 이미지 디스크 캐시
+QR_CACHE_SIZE = 512          # 메모리에 둘 QR 이미지 최대 개수
+QR_BOX_SIZE = 10             # PNG 에서 QR 한 칸의 픽셀 수
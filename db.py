@@ -0,0 +1,311 @@
+import asyncio
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import time
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# 계측용 커서: 문장 실행 시간과 읽은 행 수를 metrics 에 기록
+# config.METRICS_ENABLED 일 때만 사용하므로 꺼져 있으면 기본 sqlite3 커서 그대로임
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.record_db(time.perf_counter() - start, max(self.rowcount, 0))
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.record_db(time.perf_counter() - start, max(self.rowcount, 0))
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            metrics.add_db_rows(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        metrics.add_db_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        metrics.add_db_rows(len(rows))
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        metrics.add_db_rows(1)
+        return row
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # Connection.execute() 는 내부적으로 기본 커서를 만들므로 직접 감쌈
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# 워커(프로세스)마다 하나씩 두는 SQLite 커넥션 풀
+# - WAL 모드라서 읽기는 쓰기를 막지 않음
+# - busy_timeout 으로 "database is locked" 대신 잠깐 기다림
+# - 커넥션을 재사용하므로 sqlite3 의 statement 캐시가 그대로 유지됨
+class Database:
+    def __init__(self, path, pool_size=None, busy_timeout_ms=None,
+                 synchronous=None, cached_statements=None):
+        self.path = path
+        self.pool_size = pool_size or config.DB_POOL_SIZE
+        self.busy_timeout_ms = busy_timeout_ms or config.DB_BUSY_TIMEOUT_MS
+        self.synchronous = synchronous or config.DB_SYNCHRONOUS
+        self.cached_statements = cached_statements or config.DB_CACHED_STATEMENTS
+        self._lock = threading.Lock()
+        self._reset_pool()
+
+    def _reset_pool(self):
+        self._pid = os.getpid()
+        self._pool = queue.LifoQueue(maxsize=self.pool_size)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,  # 트랜잭션은 transaction() 에서 직접 BEGIN/COMMIT
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=TimedConnection if config.METRICS_ENABLED else sqlite3.Connection,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _acquire(self):
+        # fork 이후에는 부모 프로세스의 커넥션을 쓰면 안 되므로 풀을 새로 만듦
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset_pool()
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    # with db.transaction() as conn: ... 블록이 끝나면 COMMIT, 예외면 ROLLBACK
+    # 쓰기 트랜잭션은 BEGIN IMMEDIATE 로 처음부터 쓰기 락을 잡아 교착을 피함
+    @contextmanager
+    def transaction(self, immediate=True):
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def query(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    # fork 직전 (gunicorn preload): 마스터가 시작 준비 때 연 커넥션을 닫아서 워커에 넘어가지 않게 함 (워커는 새로 엶)
+    def before_fork(self):
+        self.close_all()
+
+    def close_all(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# 메모리 엔진: 프로세스 메모리 안의 SQLite 하나를 모든 스레드가 잠금으로 번갈아 사용
+# 디스크를 건드리지 않아 트랜잭션이 매우 짧으므로 커넥션 풀 없이 직렬화해도 충분함
+# 내구성은 MEMORY_SNAPSHOT_SECONDS 마다 새로 남기는 스냅샷 파일로 확보 (오래된 것부터 MEMORY_SNAPSHOT_KEEP 개만 남김)
+# 시작할 때 가장 최근 스냅샷에서 복원함
+# 워커 프로세스끼리 데이터를 공유하지 않으므로 워커 1개(스레드는 여러 개)로 실행해야 함
+class MemoryDatabase(Database):
+    def __init__(self, path, snapshot_dir=None, snapshot_seconds=None, snapshot_keep=None, **kwargs):
+        self.snapshot_dir = snapshot_dir or config.MEMORY_SNAPSHOT_DIR
+        self.snapshot_seconds = (snapshot_seconds if snapshot_seconds is not None
+                                 else config.MEMORY_SNAPSHOT_SECONDS)
+        self.snapshot_keep = snapshot_keep or config.MEMORY_SNAPSHOT_KEEP
+        super().__init__(path, **kwargs)
+
+    def _reset_pool(self):
+        # fork 이후에는 부모의 메모리 DB 를 쓰지 않고 스냅샷에서 다시 시작
+        self._pid = os.getpid()
+        self._conn = None
+        self._conn_lock = threading.RLock()
+        self._depth = 0
+        self._saved_changes = None
+        self._stop = None
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            ":memory:",
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=TimedConnection if config.METRICS_ENABLED else sqlite3.Connection,
+        )
+        conn.row_factory = sqlite3.Row
+        latest = self.latest_snapshot()
+        if latest is not None:
+            source = sqlite3.connect(latest)
+            try:
+                source.backup(conn)
+            finally:
+                source.close()
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        self._saved_changes = conn.total_changes
+        if self.snapshot_seconds:
+            self._stop = threading.Event()
+            threading.Thread(target=self._snapshot_loop, args=(self._stop,),
+                             name="memory-snapshot", daemon=True).start()
+        return conn
+
+    def _acquire(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset_pool()
+        self._conn_lock.acquire()
+        if self._conn is None:
+            self._conn = self._connect()
+        self._depth += 1
+        return self._conn
+
+    def _release(self, conn):
+        # 같은 스레드가 트랜잭션 안에서 connection() 을 다시 열 수 있으므로 가장 바깥에서만 정리
+        self._depth -= 1
+        if self._depth == 0 and conn.in_transaction:
+            conn.rollback()
+        self._conn_lock.release()
+
+    def _snapshot_prefix(self):
+        return os.path.join(self.snapshot_dir, os.path.basename(self.path) + ".snapshot-")
+
+    def latest_snapshot(self):
+        snapshots = self.snapshots()
+        return snapshots[-1] if snapshots else None
+
+    def snapshots(self):
+        prefix = self._snapshot_prefix()
+        if not os.path.isdir(self.snapshot_dir):
+            return []
+        return sorted(os.path.join(self.snapshot_dir, name) for name in os.listdir(self.snapshot_dir)
+                      if os.path.join(self.snapshot_dir, name).startswith(prefix) and name.endswith(".db"))
+
+    # 마지막 스냅샷 이후 바뀐 내용이 있으면 새 스냅샷 파일을 남김 (임시 파일에 쓴 뒤 이름을 바꿔서 항상 온전한 파일만 보임)
+    def snapshot(self, force=False):
+        with self.connection() as conn:
+            if not force and conn.total_changes == self._saved_changes:
+                return None
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            now = time.time()
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+            path = f"{self._snapshot_prefix()}{stamp}.db"
+            target = sqlite3.connect(path + ".tmp")
+            try:
+                conn.backup(target)
+            finally:
+                target.close()
+            os.replace(path + ".tmp", path)
+            self._saved_changes = conn.total_changes
+        for old in self.snapshots()[:-self.snapshot_keep]:
+            os.remove(old)
+        return path
+
+    def _snapshot_loop(self, stop):
+        while not stop.wait(self.snapshot_seconds):
+            try:
+                self.snapshot()
+            except Exception:
+                # 디스크 오류 등은 다음 주기에 다시 시도 (계속 실패하면 주기마다 로그가 남음)
+                logger.exception("메모리 DB 스냅샷 실패 (%s), 다음 주기에 다시 시도", self.snapshot_dir)
+
+    # fork 된 워커는 스냅샷에서 다시 시작하므로 마스터에서 바뀐 내용(마이그레이션, 저널 복구)을 먼저 남김
+    def before_fork(self):
+        if self._pid == os.getpid() and self._conn is not None:
+            self.snapshot()
+
+    # 종료 시 마지막 스냅샷을 남기고 닫음
+    def close_all(self):
+        if self._pid != os.getpid() or self._conn is None:
+            return
+        if self._stop is not None:
+            self._stop.set()
+        self.snapshot()
+        with self._conn_lock:
+            self._conn.close()
+            self._conn = None
+
+
+# ASGI 모드용 비동기 접근 계층
+# sqlite3 는 블로킹 API 라서 전용 스레드 풀에서 실행하고 이벤트 루프는 기다리기만 함
+class AsyncDatabase:
+    def __init__(self, db, max_workers=None):
+        self.db = db
+        self.max_workers = max_workers or db.pool_size
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="sqlite")
+        return self._executor
+
+    def _read(self, fn):
+        with self.db.transaction(immediate=False) as conn:
+            return fn(conn)
+
+    # fn(conn) 을 하나의 읽기 트랜잭션 안에서 실행
+    async def read(self, fn):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), self._read, fn)
+
+    async def query(self, sql, params=()):
+        return await self.read(lambda conn: conn.execute(sql, params).fetchall())
@@ -0,0 +1,75 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+# 클라이언트가 주문 시도마다 만드는 키 (UUID 등)
+KEY_PATTERN = re.compile(r"^[A-Za-z0-9_.:-]{8,64}$")
+
+
+class InvalidKey(ValueError):
+    pass
+
+
+# 요청 헤더(Idempotency-Key) 또는 JSON 본문(idempotencyKey)의 키. 없으면 None
+def request_key(headers, data):
+    key = headers.get("Idempotency-Key") or (data or {}).get("idempotencyKey")
+    if key is None:
+        return None
+    if not isinstance(key, str) or not KEY_PATTERN.match(key):
+        raise InvalidKey(key)
+    return key
+
+
+# 최근 처리한 키 -> 주문 id (워커 메모리, TTL + 최대 개수 제한)
+# 같은 워커로 들어온 재시도는 DB 를 전혀 건드리지 않고 여기서 끝남
+class RecentKeys:
+    def __init__(self, ttl_seconds=None, maxsize=None):
+        self.ttl = ttl_seconds or config.IDEMPOTENCY_TTL_SECONDS
+        self.maxsize = maxsize or config.IDEMPOTENCY_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            order_id, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            return order_id
+
+    def put(self, key, order_id):
+        with self._lock:
+            self._entries[key] = (order_id, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+# 디스크 인덱스 (다른 워커가 처리한 키, 워커 재시작 후의 재시도용)
+def lookup(conn, key):
+    row = conn.execute("SELECT order_id FROM order_requests WHERE key=?", (key,)).fetchone()
+    return row["order_id"] if row else None
+
+
+# 쓰기 트랜잭션 안에서 키를 다시 확인하고, 처음 보는 키일 때만 insert(conn) 실행
+# (order_id, 새로 만들었는지) 를 돌려줌. 같은 배치에 들어온 중복도 여기서 걸러짐
+def insert_once(conn, key, insert):
+    order_id = lookup(conn, key)
+    if order_id is not None:
+        return order_id, False
+    order_id = insert(conn)
+    conn.execute("INSERT INTO order_requests (key, order_id) VALUES (?, ?)", (key, order_id))
+    return order_id, True
+
+
+# TTL 이 지난 키 삭제 (아카이버가 주기적으로 호출)
+def prune(conn, ttl_seconds=None):
+    ttl = ttl_seconds or config.IDEMPOTENCY_TTL_SECONDS
+    return conn.execute("DELETE FROM order_requests WHERE created_at <= datetime('now', ?)",
+                        (f"-{int(ttl)} seconds",)).rowcount
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+
+import config
+
+
+class Subscription(queue.Queue):
+    # 큐가 가득 차 있으므로 하나 비우고 종료 신호(None)를 넣음
+    def close(self):
+        try:
+            self.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self.put_nowait(None)
+        except queue.Full:
+            pass
+
+
+# ASGI(이벤트 루프)용 구독: publish 는 다른 스레드에서 오므로 call_soon_threadsafe 로 전달
+class AsyncSubscription:
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.maxsize = maxsize
+        self.queue = asyncio.Queue()
+
+    def put_nowait(self, message):
+        if self.queue.qsize() >= self.maxsize:
+            raise queue.Full
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+
+
+# 프로세스 내부 pub/sub
+# 주문 생성/삭제/상태 변경 시 publish 하면, 구독 중인 관리자 화면(SSE)으로 바로 전달됨
+# 다른 워커 프로세스의 변경은 publish 가 오지 않으므로, 구독자가 있는 동안 감시 스레드 하나가
+# EVENT_WATCH_SECONDS 마다 watch() 값(주문 변경 순번)을 확인하고 바뀌면 "orders-changed" 를 보냄
+class Broker:
+    def __init__(self, max_pending=256, watch=None, watch_seconds=None):
+        self.max_pending = max_pending
+        self.watch = watch
+        self.watch_seconds = watch_seconds if watch_seconds is not None else config.EVENT_WATCH_SECONDS
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._watcher_pid = None
+
+    def subscribe(self):
+        return self._add(Subscription(maxsize=self.max_pending))
+
+    def subscribe_async(self, loop):
+        return self._add(AsyncSubscription(loop, self.max_pending))
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscribers.add(subscription)
+            # 감시 스레드는 fork 후 자식 프로세스로 넘어가지 않으므로 프로세스마다 띄움
+            if self.watch is not None and self._watcher_pid != os.getpid():
+                self._watcher_pid = os.getpid()
+                threading.Thread(target=self._watch, name="broker-watch", daemon=True).start()
+        return subscription
+
+    # 구독자가 모두 떠나면 멈춤 (다음 구독 때 다시 띄움)
+    def _watch(self):
+        last = None
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._watcher_pid = None
+                    return
+            try:
+                value = self.watch()
+            except Exception:
+                value = last  # DB 가 잠시 바쁘면 다음 확인 때 다시 봄
+            if last is not None and value != last:
+                self.publish("orders-changed")
+            last = value
+            time.sleep(self.watch_seconds)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event_type, data=None):
+        message = (event_type, data or {})
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                # 너무 느린 클라이언트는 끊고 다시 접속하게 함 (재접속 시 커서로 따라잡음)
+                self.unsubscribe(subscription)
+                subscription.close()
+
+
+def format_sse(event_type, data):
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event_type}\ndata: {payload}\n\n"
+
+
+# SSE 응답 본문 생성기: 이벤트가 없으면 heartbeat 주석만 보내서 연결을 유지
+def stream(broker, heartbeat=15):
+    subscription = broker.subscribe()
+    try:
+        yield "retry: 2000\n\n"
+        while True:
+            try:
+                message = subscription.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            if message is None:
+                return
+            yield format_sse(*message)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+# stream() 의 비동기 버전 (ASGI 모드에서 스레드 없이 연결을 유지)
+async def astream(broker, heartbeat=15):
+    subscription = broker.subscribe_async(asyncio.get_running_loop())
+    try:
+        yield "retry: 2000\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if message is None:
+                return
+            yield format_sse(*message)
+    finally:
+        broker.unsubscribe(subscription)
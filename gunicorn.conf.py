@@ -0,0 +1,26 @@
+# gunicorn 설정 (작업 디렉터리의 gunicorn.conf.py 는 gunicorn 이 자동으로 읽음)
+#   gunicorn app:app --worker-class gthread --threads 32
+#
+# preload: 마스터가 app 을 한 번만 import 해서 스키마 마이그레이션, 저널 복구, 템플릿 컴파일,
+#          메뉴/페이지 캐시 준비를 끝낸 뒤 워커를 fork 함
+#          워커는 준비된 메모리를 copy-on-write 로 함께 쓰므로 워커를 늘리거나 재시작해도 첫 요청이 느리지 않음
+# 워커 수는 WEB_CONCURRENCY 환경 변수 (Heroku 가 설정) 또는 --workers
+# (모듈 이름이 gunicorn 설정 이름과 겹치지 않도록 필요한 값만 가져옴)
+from config import STORAGE_ENGINE
+
+preload_app = True
+
+# 메모리 엔진은 워커끼리 데이터를 공유하지 않으므로 워커 1개로만 실행
+if STORAGE_ENGINE == "memory":
+    workers = 1
+
+
+def pre_fork(server, worker):
+    import app
+    app.before_fork()
+
+
+# 워커가 요청을 받기 전에 커넥션/저널 복구/백그라운드 작업을 준비 (/readyz 가 준비됨으로 바뀜)
+def post_fork(server, worker):
+    import app
+    app.prepare_worker()
@@ -0,0 +1,243 @@
+import json
+import logging
+import os
+import threading
+
+import config
+import migrations
+import order_store
+import stats
+from db import Database
+
+try:
+    import fcntl
+except ImportError:  # Windows 개발 환경: 프로세스 1개로만 실행하므로 파일 잠금 없이 사용
+    fcntl = None
+
+# 주문 이벤트 저널 (추가 전용)
+# 주문이 들어오거나(placed), 상태/자리/메뉴가 바뀌거나(status/moved/edited), 이력 테이블로 옮겨질 때(archived)
+# DB 트리거가 같은 트랜잭션에서 order_events 에 한 줄씩 남김 (마이그레이션 8)
+# 기록 스레드가 JOURNAL_FLUSH_SECONDS 동안 모인 새 이벤트를 JSON 한 줄씩 저널 파일 끝에 붙이고 fsync 는 한 번만 함
+# - 분쟁 시 주문별 이력 확인 (order_events)
+# - 시작할 때 DB 에 없는 이벤트를 파일에서 다시 적용 (recover: 메모리 엔진의 마지막 스냅샷 이후, 백업에서 되살린 DB 등)
+# - 저널 파일만으로 새 DB 에 주문/이력/통계를 다시 만듦 (flask replay-journal, 운영 DB 는 잠그지 않음)
+
+COLUMNS = ("seq", "order_id", "type", "seat", "salt_id", "drink_id", "status", "at")
+
+logger = logging.getLogger(__name__)
+
+# 파일 끝에서 마지막 이벤트를 찾을 때 읽는 크기 (이벤트 한 줄은 200바이트 안팎)
+_TAIL_BYTES = 8192
+
+
+def journal_path(db_path):
+    return os.path.join(config.JOURNAL_DIR, os.path.basename(db_path) + ".journal")
+
+
+def event_dict(row):
+    return {column: row[column] for column in COLUMNS}
+
+
+def order_events(conn, order_id):
+    return [event_dict(row) for row in conn.execute(
+        f"SELECT {', '.join(COLUMNS)} FROM order_events WHERE order_id = ? ORDER BY seq", (order_id,))]
+
+
+def last_seq(conn):
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM order_events").fetchone()[0]
+
+
+# 저널 파일의 이벤트를 순서대로 (seq 가 after 보다 큰 것만)
+# 기록 도중 멈춰서 잘린 마지막 줄은 건너뜀
+def read_events(path, after=0):
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            event = json.loads(line)
+            if event["seq"] > after:
+                yield event
+
+
+# 저널 파일의 마지막 seq
+# repair 이면 잘린 마지막 줄을 잘라 내서 다음 기록이 온전한 줄 뒤에 붙게 함
+def _file_tail(f, repair=True):
+    size = f.seek(0, os.SEEK_END)
+    start = max(0, size - _TAIL_BYTES)
+    f.seek(start)
+    data = f.read()
+    end = data.rfind(b"\n")
+    if repair and start + end + 1 < size:
+        f.truncate(start + end + 1)
+    if end < 0:
+        return 0
+    return json.loads(data[:end].rsplit(b"\n", 1)[-1])["seq"]
+
+
+# 메뉴는 저널에 남지 않으므로, 이벤트가 가리키는 메뉴 id 가 DB 에 없으면 (새 DB 에 다시 만들 때, 스냅샷 이후 추가된 메뉴)
+# 판매 종료(retired) 항목을 자리표시로 넣어 외래 키를 맞춤 (known: 이미 확인한 id)
+def _ensure_menu(conn, event, known):
+    for kind in ("salt", "drink"):
+        item_id = event[f"{kind}_id"]
+        if item_id is None or item_id in known:
+            continue
+        conn.execute("""
+            INSERT OR IGNORE INTO menu_items (id, kind, code, label_ko, available, retired, sort_order)
+            VALUES (?, ?, ?, ?, 0, 1, 1000)
+        """, (item_id, kind, f"journal-{item_id}", f"{kind} #{item_id}"))
+        known.add(item_id)
+
+
+# 이벤트 하나를 주문/이력/통계 테이블에 적용 (replay 안에서만 호출)
+def _apply(conn, event, known):
+    order_id, kind = event["order_id"], event["type"]
+    if kind != "archived":
+        _ensure_menu(conn, event, known)
+    if kind == "placed":
+        conn.execute("""
+            INSERT OR IGNORE INTO orders (id, seat, salt_id, drink_id, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (order_id, event["seat"], event["salt_id"], event["drink_id"], event["status"],
+              event["at"], event["at"]))
+        stats.record(conn, event["seat"], event["salt_id"], event["drink_id"], when=stats.local_time(event["at"]))
+    elif kind == "archived":
+        row = conn.execute("SELECT created_at, version FROM orders WHERE id = ?", (order_id,)).fetchone()
+        if row is not None:
+            table = order_store.create_history_table(conn, row["created_at"][:7])
+            conn.execute("UPDATE order_seq SET archived_through = MAX(archived_through, ?) WHERE id = 1",
+                         (row["version"],))
+            conn.execute(f"""
+                INSERT OR REPLACE INTO {table} (id, seat, salt_id, drink_id, status, created_at, updated_at, archived_at)
+                SELECT id, seat, salt_id, drink_id, status, created_at, updated_at, ? FROM orders WHERE id = ?
+            """, (event["at"], order_id))
+            conn.execute("DELETE FROM orders WHERE id = ?", (order_id,))
+    else:
+        row = conn.execute("SELECT seat, salt_id, drink_id, created_at FROM orders WHERE id = ?", (order_id,)).fetchone()
+        if row is not None and (row["seat"], row["salt_id"], row["drink_id"]) != (
+                event["seat"], event["salt_id"], event["drink_id"]):
+            stats.change(conn, row, event)
+        conn.execute("""
+            UPDATE orders SET seat=?, salt_id=?, drink_id=?, status=?, updated_at=? WHERE id=?
+        """, (event["seat"], event["salt_id"], event["drink_id"], event["status"], event["at"], order_id))
+    conn.execute(f"INSERT INTO order_events ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                 [event[column] for column in COLUMNS])
+
+
+# 이벤트들을 순서대로 적용하고 적용한 개수를 돌려줌 (쓰기 트랜잭션 안에서 호출)
+# 적용하는 동안 트리거가 같은 이벤트를 다시 남기지 않도록 journal_state.replaying 을 켬
+def replay(conn, events):
+    conn.execute("UPDATE journal_state SET replaying = 1 WHERE id = 1")
+    count = 0
+    known = set()
+    try:
+        for event in events:
+            _apply(conn, event, known)
+            count += 1
+    finally:
+        conn.execute("UPDATE journal_state SET replaying = 0 WHERE id = 1")
+    return count
+
+
+class Journal:
+    def __init__(self, db, path=None, flush_seconds=None):
+        self.db = db
+        self.path = path or journal_path(db.path)
+        self.flush_seconds = (flush_seconds if flush_seconds is not None
+                              else config.JOURNAL_FLUSH_SECONDS)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._wake = None
+        self._stop = None
+        self._written = 0
+
+    # 파일에는 있지만 DB 에는 없는 이벤트를 적용 (매장을 열 때 마이그레이션 직후, fork 된 워커 시작 시)
+    # 파일 끝만 읽어서 DB 가 최신이면 (보통의 경우) 파일 전체를 훑지 않음
+    def recover(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "rb") as f:
+            file_seq = _file_tail(f, repair=False)
+        with self.db.transaction() as conn:
+            after = last_seq(conn)
+            if file_seq <= after:
+                return 0
+            return replay(conn, read_events(self.path, after=after))
+
+    # 새 이벤트가 생겼음을 알림 (이 프로세스의 기록 스레드가 없으면 띄움)
+    def notify(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # 스레드는 fork 후 자식 프로세스로 넘어가지 않으므로 프로세스마다 새로 띄움
+                    self._wake = threading.Event()
+                    self._stop = threading.Event()
+                    threading.Thread(target=self._run, args=(self._wake, self._stop),
+                                     name="order-journal", daemon=True).start()
+                    self._pid = os.getpid()
+        self._wake.set()
+
+    def _run(self, wake, stop):
+        while True:
+            wake.wait()
+            # 잠시 기다렸다가 그동안 모인 이벤트를 한 번에 기록 (fsync 한 번)
+            if stop.wait(self.flush_seconds):
+                break
+            wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # 디스크 오류 등: 이벤트는 DB 에 남아 있으므로 새 주문이 없어도 잠시 뒤 다시 기록
+                logger.exception("주문 이벤트 저널 기록 실패 (%s), %s초 뒤 다시 시도", self.path, config.JOURNAL_RETRY_SECONDS)
+                if stop.wait(config.JOURNAL_RETRY_SECONDS):
+                    break
+                wake.set()
+
+    # 파일에 아직 없는 이벤트를 붙이고 fsync, 붙인 개수를 돌려줌
+    # 여러 워커가 같은 파일에 쓰므로 파일 잠금 안에서 파일의 마지막 seq 를 다시 확인함
+    def flush(self):
+        with self.db.connection() as conn:
+            if last_seq(conn) <= self._written:
+                return 0
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                written = _file_tail(f)
+                with self.db.transaction(immediate=False) as conn:
+                    rows = conn.execute(f"""
+                        SELECT {', '.join(COLUMNS)} FROM order_events WHERE seq > ? ORDER BY seq
+                    """, (written,)).fetchall()
+                if rows:
+                    f.write(b"".join(json.dumps(event_dict(row), ensure_ascii=False).encode() + b"\n"
+                                     for row in rows))
+                    f.flush()
+                    os.fsync(f.fileno())
+                    written = rows[-1]["seq"]
+                self._written = written
+                return len(rows)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    # 기록 스레드를 멈추고 남은 이벤트를 기록
+    def close(self):
+        if self._pid == os.getpid():
+            self._stop.set()
+            self._wake.set()
+        self.flush()
+
+
+# 저널 파일로 새 DB 파일(target)을 만듦: 스키마를 만든 뒤 모든 이벤트를 다시 적용
+def rebuild(path, target):
+    if os.path.exists(target):
+        raise FileExistsError(target)
+    db = Database(target, pool_size=1)
+    try:
+        migrations.migrate(db)
+        with db.transaction() as conn:
+            return replay(conn, read_events(path))
+    finally:
+        db.close_all()
@@ -0,0 +1,195 @@
+import heapq
+import threading
+import time
+from datetime import datetime, timezone
+
+import config
+import order_store
+
+# 주방/바 준비 대기열
+# 음료는 메뉴의 station(hot/cold) 별로 나뉘고, 스테이션마다 힙으로 다음에 만들 주문을 고름
+# 우선순위 = 주문 시각 + 준비 시간 x KITCHEN_PREP_WEIGHT (비슷한 시각이면 빨리 끝나는 음료 먼저)
+# orders 테이블을 다시 훑지 않고 changes_since() 커서로 바뀐 주문만 반영함
+
+DEFAULT_STATION = "cold"
+DEFAULT_PREP_SECONDS = 90
+
+
+def _timestamp(value):
+    # SQLite datetime('now') 형식 (UTC)
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+
+
+class Ticket:
+    __slots__ = ("id", "seat", "salt_id", "drink_id", "station", "prep_seconds",
+                 "status", "created", "started", "priority")
+
+    def __init__(self, order, menu):
+        drink = menu.items.get(order["drink_id"])
+        self.id = order["id"]
+        self.seat = order["seat"]
+        self.salt_id = order["salt_id"]
+        self.drink_id = order["drink_id"]
+        self.station = (drink and drink.station) or DEFAULT_STATION
+        self.prep_seconds = (drink and drink.prep_seconds) or DEFAULT_PREP_SECONDS
+        self.status = order["status"]
+        self.created = _timestamp(order["created_at"])
+        self.started = _timestamp(order["updated_at"]) if self.status == order_store.STATUS_PREPARING else None
+        self.priority = self.created + self.prep_seconds * config.KITCHEN_PREP_WEIGHT
+
+    # 준비 중인 음료가 끝날 때까지 남은 예상 시간
+    def remaining(self, now):
+        if self.started is None:
+            return self.prep_seconds
+        return max(0, self.prep_seconds - (now - self.started))
+
+    def to_json(self, menu, wait_seconds=None):
+        order = menu.describe({"id": self.id, "seat": self.seat, "salt_id": self.salt_id,
+                               "drink_id": self.drink_id, "status": self.status})
+        order.update(station=self.station, prep_seconds=self.prep_seconds)
+        if wait_seconds is not None:
+            order["wait_seconds"] = int(wait_seconds)
+        return order
+
+
+# 매장마다 하나 (워커 메모리)
+class KitchenQueue:
+    def __init__(self, refresh_seconds=None):
+        self.refresh_seconds = (refresh_seconds if refresh_seconds is not None
+                                else config.KITCHEN_REFRESH_SECONDS)
+        self._lock = threading.RLock()
+        self._cursor = 0
+        self._refreshed = 0
+        self._tickets = {}   # 주문 id -> Ticket (대기 중, 준비 중)
+        self._heaps = {}     # 스테이션 -> [(우선순위, 주문 id)]  지난 항목은 꺼낼 때 버림
+
+    # 트랜잭션이 실패했을 때처럼 메모리 상태를 믿을 수 없으면 다음 refresh 때 전체를 다시 읽음
+    def invalidate(self):
+        with self._lock:
+            self._cursor = 0
+            self._refreshed = 0
+
+    # 마지막 반영 이후 바뀐 주문만 반영 (읽기 트랜잭션 또는 쓰기 트랜잭션 안에서 호출)
+    def refresh(self, conn, menu):
+        with self._lock:
+            cursor, reset, changed = order_store.changes_since(conn, self._cursor)
+            if reset:
+                self._tickets.clear()
+                self._heaps.clear()
+            for order in changed:
+                self._apply(order, menu)
+            self._cursor = cursor
+            self._refreshed = time.monotonic()
+
+    # 최근에 반영했으면 DB 를 읽지 않음 (손님 화면 폴링용)
+    def refresh_if_stale(self, db, menu):
+        if time.monotonic() - self._refreshed < self.refresh_seconds:
+            return
+        with db.transaction(immediate=False) as conn:
+            self.refresh(conn, menu)
+
+    def _apply(self, order, menu):
+        ticket = self._tickets.get(order["id"])
+        if order["status"] not in order_store.ACTIVE_STATUSES:
+            self._tickets.pop(order["id"], None)
+            return
+        if ticket is None:
+            ticket = self._tickets[order["id"]] = Ticket(order, menu)
+            if ticket.status == order_store.STATUS_WAITING:
+                heapq.heappush(self._heaps.setdefault(ticket.station, []), (ticket.priority, ticket.id))
+            return
+        if (order["seat"], order["salt_id"], order["drink_id"]) != (ticket.seat, ticket.salt_id, ticket.drink_id):
+            # 자리 이동/메뉴 변경 (관리자 일괄 작업): 티켓을 다시 만들고, 스테이션이나 우선순위가 바뀌면 힙에 새로 넣음
+            # 예전 힙 항목은 _valid 에서 걸러짐
+            old = ticket
+            ticket = self._tickets[order["id"]] = Ticket(order, menu)
+            if old.status == order_store.STATUS_PREPARING and ticket.status == order_store.STATUS_PREPARING:
+                ticket.started = old.started
+            if (ticket.status == order_store.STATUS_WAITING
+                    and (ticket.station, ticket.priority) != (old.station, old.priority)):
+                heapq.heappush(self._heaps.setdefault(ticket.station, []), (ticket.priority, ticket.id))
+            return
+        if order["status"] == order_store.STATUS_PREPARING and ticket.status != order_store.STATUS_PREPARING:
+            ticket.status = order_store.STATUS_PREPARING
+            ticket.started = _timestamp(order["updated_at"])
+
+    # 힙 항목이 지금 티켓과 맞는지 (대기 중이고, 같은 스테이션/우선순위)
+    def _valid(self, station, entry):
+        ticket = self._tickets.get(entry[1])
+        return (ticket is not None and ticket.status == order_store.STATUS_WAITING
+                and ticket.station == station and ticket.priority == entry[0])
+
+    # 스테이션의 대기 중 티켓 (우선순위 순서)
+    def _waiting(self, station):
+        heap = self._heaps.get(station, [])
+        # 지난 항목이 너무 많이 쌓이면 힙을 다시 만듦
+        live = [entry for entry in heap if self._valid(station, entry)]
+        if len(heap) > 2 * len(live) + 32:
+            heapq.heapify(live)
+            self._heaps[station] = live
+        return [self._tickets[entry[1]] for entry in sorted(live)]
+
+    def _preparing(self, station):
+        return [ticket for ticket in self._tickets.values()
+                if ticket.station == station and ticket.status == order_store.STATUS_PREPARING]
+
+    # 스테이션 화면: 준비 중 티켓과 대기 중 티켓(예상 대기 시간 포함)
+    def station_view(self, station, menu):
+        with self._lock:
+            now = time.time()
+            preparing = self._preparing(station)
+            waits = self._waits(station, now)
+            return {
+                "station": station,
+                "preparing": [ticket.to_json(menu, ticket.remaining(now)) for ticket in preparing],
+                "waiting": [ticket.to_json(menu, wait) for ticket, wait in waits],
+            }
+
+    # 대기 중 티켓마다 (티켓, 완성까지 예상 시간)
+    # 스테이션 직원 수(KITCHEN_STATIONS)만큼 동시에 만든다고 보고 앞선 음료의 준비 시간을 나눔
+    def _waits(self, station, now):
+        staff = max(1, config.KITCHEN_STATIONS.get(station, 1))
+        ahead = sum(ticket.remaining(now) for ticket in self._preparing(station))
+        waits = []
+        for ticket in self._waiting(station):
+            waits.append((ticket, ahead / staff + ticket.prep_seconds))
+            ahead += ticket.prep_seconds
+        return waits
+
+    # 좌석의 진행 중 주문이 모두 나올 때까지 예상 시간 (진행 중 주문이 없으면 None)
+    def seat_wait(self, seat):
+        with self._lock:
+            now = time.time()
+            seat = str(seat)
+            stations = {ticket.station for ticket in self._tickets.values() if ticket.seat == seat}
+            if not stations:
+                return None
+            longest = 0
+            for station in stations:
+                for ticket in self._preparing(station):
+                    if ticket.seat == seat:
+                        longest = max(longest, ticket.remaining(now))
+                for ticket, wait in self._waits(station, now):
+                    if ticket.seat == seat:
+                        longest = max(longest, wait)
+            return longest
+
+    # 스테이션에서 다음 티켓을 가져감 (대기 중 -> 준비 중)
+    # 쓰기 트랜잭션 안에서 호출해야 다른 워커와 같은 주문을 동시에 가져가지 않음
+    def claim(self, conn, station, menu):
+        with self._lock:
+            self.refresh(conn, menu)
+            heap = self._heaps.get(station, [])
+            while heap:
+                priority, order_id = heapq.heappop(heap)
+                if not self._valid(station, (priority, order_id)):
+                    continue
+                claimed = conn.execute("""
+                    UPDATE orders SET status=?, updated_at=datetime('now') WHERE id=? AND status=?
+                """, (order_store.STATUS_PREPARING, order_id, order_store.STATUS_WAITING)).rowcount
+                if claimed:
+                    ticket = self._tickets[order_id]
+                    ticket.status = order_store.STATUS_PREPARING
+                    ticket.started = time.time()
+                    return ticket
+            return None
@@ -0,0 +1,181 @@
+# 요청 단위 성능 계측 + Prometheus 텍스트 형식의 /metrics
+# config.METRICS_ENABLED 가 False 이면 훅을 하나도 등록하지 않으므로 오버헤드가 없음
+# 값은 워커 프로세스마다 따로 쌓임 (gunicorn 워커가 여러 개면 워커별로 수집됨)
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+import config
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_local = threading.local()
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+# 요청 하나 동안 모으는 값 (DB 시간/문장 수/행 수, 템플릿 렌더링 시간)
+class RequestStats:
+    __slots__ = ("db_time", "db_statements", "db_rows", "template_time")
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_statements = 0
+        self.db_rows = 0
+        self.template_time = 0.0
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = defaultdict(Histogram)   # (route, method) -> 전체 처리 시간
+        self.db_latency = defaultdict(Histogram)  # (route, method) -> 요청당 DB 시간
+        self.counters = defaultdict(float)      # (이름, 라벨) -> 누적값
+
+    def observe_request(self, route, method, status, elapsed, stats):
+        key = (route, method)
+        with self._lock:
+            self.latency[key].observe(elapsed)
+            self.db_latency[key].observe(stats.db_time)
+            self.counters[("qr_requests_total", key + (str(status),))] += 1
+            self.counters[("qr_db_statements_total", key)] += stats.db_statements
+            self.counters[("qr_db_rows_total", key)] += stats.db_rows
+            self.counters[("qr_template_render_seconds_total", key)] += stats.template_time
+
+    def observe_background_db(self, elapsed, rows):
+        with self._lock:
+            self.counters[("qr_background_db_seconds_total", ())] += elapsed
+            self.counters[("qr_background_db_statements_total", ())] += 1
+            self.counters[("qr_background_db_rows_total", ())] += rows
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, histograms, help_text in (
+                ("qr_request_duration_seconds", self.latency, "요청 처리 시간"),
+                ("qr_request_db_seconds", self.db_latency, "요청당 SQLite 사용 시간"),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (route, method), h in sorted(histograms.items()):
+                    labels = f'route="{route}",method="{method}"'
+                    for bound, count in zip(BUCKETS, h.counts):
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+                    lines.append(f"{name}_sum{{{labels}}} {h.total:.6f}")
+                    lines.append(f"{name}_count{{{labels}}} {h.count}")
+
+            typed = set()
+            for (name, key), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{_labels(name, key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(name, key):
+    if not key:
+        return ""
+    names = ("route", "method", "status") if name == "qr_requests_total" else ("route", "method")
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, key)) + "}"
+
+
+registry = Registry()
+
+
+def current():
+    return getattr(_local, "stats", None)
+
+
+# DB 계층(db.TimedCursor)에서 호출
+def record_db(elapsed, rows):
+    stats = current()
+    if stats is None:
+        registry.observe_background_db(elapsed, rows)
+        return
+    stats.db_time += elapsed
+    stats.db_statements += 1
+    stats.db_rows += rows
+
+
+# 그룹 커밋 큐에서 커밋을 기다린 시간도 요청의 DB 시간으로 봄
+def record_db_wait(elapsed):
+    stats = current()
+    if stats is not None:
+        stats.db_time += elapsed
+
+
+def add_db_rows(rows):
+    stats = current()
+    if stats is not None:
+        stats.db_rows += rows
+
+
+@contextmanager
+def timed_template():
+    stats = current()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.template_time += time.perf_counter() - start
+
+
+def _before_request():
+    _local.stats = RequestStats()
+    g.metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    stats = current()
+    start = g.pop("metrics_start", None)
+    if stats is None or start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    registry.observe_request(route, request.method, response.status_code, elapsed, stats)
+    if config.SERVER_TIMING:
+        response.headers["Server-Timing"] = (
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.db_statements} queries", '
+            f"tpl;dur={stats.template_time * 1000:.2f}, "
+            f"total;dur={elapsed * 1000:.2f}"
+        )
+    return response
+
+
+def _teardown_request(exc):
+    _local.stats = None
+
+
+def metrics_view():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    if not config.METRICS_ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
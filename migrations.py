@@ -0,0 +1,346 @@
+# 스키마 마이그레이션
+# PRAGMA user_version 에 적용된 마이그레이션 개수를 기록하고, 그 이후 것만 순서대로 실행함
+# 각 항목은 SQL 문장 목록이거나, 데이터 변환이 필요한 경우 fn(conn) 함수
+# 새 변경은 항상 목록 끝에 추가할 것 (이미 배포된 항목은 수정하지 않음)
+
+import stats
+
+# 4번 마이그레이션에서 넣는 초기 메뉴
+# (종류, 코드, 한국어, 영어, 중국어, 온도, 정렬 순서) - 코드는 예전 주문에 저장되던 문자열
+MENU_SEED = [
+    ("salt", "라벤더", "라벤더", "Lavender", "薰衣草", None, 10),
+    ("salt", "스피아민트", "스피아민트", "Spearmint", "留兰香", None, 20),
+    ("salt", "히말라야", "히말라야", "Himalayan", "喜马拉雅", None, 30),
+    ("drink", "아메리카노(HOT)", "아메리카노", "Americano", "美式咖啡 (热)", "HOT", 10),
+    ("drink", "아메리카노(COLD)", "아메리카노", "Americano", "美式咖啡 (冰)", "COLD", 20),
+    ("drink", "캐모마일(HOT)", "캐모마일", "Chamomile", "洋甘菊茶 (热)", "HOT", 30),
+    ("drink", "캐모마일(COLD)", "캐모마일", "Chamomile", "洋甘菊茶 (冰)", "COLD", 40),
+    ("drink", "페퍼민트(HOT)", "페퍼민트", "peppermint", "薄荷茶 (热)", "HOT", 50),
+    ("drink", "페퍼민트(COLD)", "페퍼민트", "peppermint", "薄荷茶 (冰)", "COLD", 60),
+    ("drink", "루이보스(HOT)", "루이보스", "Rooibos", "南非红茶 (热)", "HOT", 70),
+    ("drink", "루이보스(COLD)", "루이보스", "Rooibos", "南非红茶 (冰)", "COLD", 80),
+    ("drink", "얼그레이(HOT)", "얼그레이", "Earlgray", "伯爵茶 (热)", "HOT", 90),
+    ("drink", "얼그레이(COLD)", "얼그레이", "Earlgray", "伯爵茶 (冰)", "COLD", 100),
+    ("drink", "핫초코(Only HOT)", "핫초코", "Hot chocolate", "热巧克力", "Only HOT", 110),
+    ("drink", "아이스티(Only ICE)", "아이스티", "Iced Tea", "冰茶", "Only ICE", 120),
+    ("drink", "사과주스(Only ICE)", "사과주스", "Apple Juice", "苹果汁", "Only ICE", 130),
+    ("drink", "오렌지주스(Only ICE)", "오렌지주스", "Orange Juice", "橙汁", "Only ICE", 140),
+]
+
+
+def _replace_sequence(conn, table, seq):
+    # 테이블을 다시 만들면 AUTOINCREMENT 순번이 남은 행의 최대 id 로 돌아가므로
+    # 이미 이력 테이블로 옮겨진 주문 id 가 재사용되지 않도록 예전 값을 복원
+    if conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (seq, table)).rowcount == 0:
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, seq))
+
+
+def _stats_rollups(conn):
+    for period in ("hour", "day"):
+        table = "stats_hourly" if period == "hour" else "stats_daily"
+        conn.execute(f"""
+            CREATE TABLE {table} (
+                {period} TEXT NOT NULL,
+                seat TEXT NOT NULL,
+                salt_id INTEGER NOT NULL,
+                drink_id INTEGER NOT NULL,
+                orders INTEGER NOT NULL,
+                PRIMARY KEY ({period}, seat, salt_id, drink_id)
+            ) WITHOUT ROWID
+        """)
+    stats.rebuild(conn)
+
+
+def _order_events(conn):
+    conn.execute("""
+        CREATE TABLE order_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            seat TEXT NOT NULL,
+            salt_id INTEGER NOT NULL,
+            drink_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX idx_order_events_order ON order_events (order_id, seq)")
+    # 저널을 다시 적용하는 동안에는 트리거가 이벤트를 또 남기지 않도록 끔
+    conn.execute("CREATE TABLE journal_state (id INTEGER PRIMARY KEY CHECK (id = 1), replaying INTEGER NOT NULL)")
+    conn.execute("INSERT INTO journal_state (id, replaying) VALUES (1, 0)")
+
+    # 기존 주문: 접수 -> (현재 상태) -> (이력으로 옮김) 순서로 채움
+    history = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'orders_history_%'")]
+    source = " UNION ALL ".join(
+        ["SELECT id, seat, salt_id, drink_id, status, created_at, updated_at, NULL AS archived_at FROM orders"]
+        + [f"SELECT id, seat, salt_id, drink_id, status, created_at, updated_at, archived_at FROM {table}"
+           for table in history])
+    conn.execute(f"""
+        INSERT INTO order_events (order_id, type, seat, salt_id, drink_id, status, at)
+        SELECT id, 'placed', seat, salt_id, drink_id, '대기 중', created_at FROM ({source}) ORDER BY id
+    """)
+    conn.execute(f"""
+        INSERT INTO order_events (order_id, type, seat, salt_id, drink_id, status, at)
+        SELECT id, 'status', seat, salt_id, drink_id, status, updated_at FROM ({source})
+        WHERE status != '대기 중' ORDER BY updated_at, id
+    """)
+    conn.execute(f"""
+        INSERT INTO order_events (order_id, type, seat, salt_id, drink_id, status, at)
+        SELECT id, 'archived', seat, salt_id, drink_id, status, archived_at FROM ({source})
+        WHERE archived_at IS NOT NULL ORDER BY archived_at, id
+    """)
+
+    replaying = "WHEN (SELECT replaying FROM journal_state WHERE id = 1) = 0"
+    conn.execute(f"""
+        CREATE TRIGGER order_events_insert AFTER INSERT ON orders {replaying}
+        BEGIN
+            INSERT INTO order_events (order_id, type, seat, salt_id, drink_id, status, at)
+            VALUES (NEW.id, 'placed', NEW.seat, NEW.salt_id, NEW.drink_id, NEW.status, NEW.created_at);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER order_events_update AFTER UPDATE OF seat, salt_id, drink_id, status ON orders
+        {replaying} AND (NEW.status IS NOT OLD.status OR NEW.seat IS NOT OLD.seat
+                         OR NEW.salt_id IS NOT OLD.salt_id OR NEW.drink_id IS NOT OLD.drink_id)
+        BEGIN
+            INSERT INTO order_events (order_id, type, seat, salt_id, drink_id, status, at)
+            VALUES (NEW.id,
+                    CASE WHEN NEW.status IS NOT OLD.status THEN 'status'
+                         WHEN NEW.seat IS NOT OLD.seat THEN 'moved'
+                         ELSE 'edited' END,
+                    NEW.seat, NEW.salt_id, NEW.drink_id, NEW.status, datetime('now'));
+        END
+    """)
+    # 주문 행은 이력 테이블로 옮길 때만 지워짐
+    conn.execute(f"""
+        CREATE TRIGGER order_events_delete AFTER DELETE ON orders {replaying}
+        BEGIN
+            INSERT INTO order_events (order_id, type, seat, salt_id, drink_id, status, at)
+            VALUES (OLD.id, 'archived', OLD.seat, OLD.salt_id, OLD.drink_id, OLD.status, datetime('now'));
+        END
+    """)
+    # 추가 전용: 이미 남은 이벤트는 고치거나 지울 수 없음
+    for action in ("UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER order_events_no_{action.lower()} BEFORE {action} ON order_events
+            BEGIN
+                SELECT RAISE(ABORT, 'order_events is append-only');
+            END
+        """)
+
+
+def _menu_catalog(conn):
+    conn.execute("""
+        CREATE TABLE menu_items (
+            id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL CHECK (kind IN ('salt', 'drink')),
+            code TEXT NOT NULL,
+            label_ko TEXT NOT NULL,
+            label_en TEXT NOT NULL DEFAULT '',
+            label_zh TEXT NOT NULL DEFAULT '',
+            temperature TEXT,
+            sort_order INTEGER NOT NULL DEFAULT 0,
+            available INTEGER NOT NULL DEFAULT 1,
+            retired INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (kind, code)
+        )
+    """)
+    conn.execute("CREATE TABLE menu_meta (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)")
+    conn.execute("INSERT INTO menu_meta (id, version) VALUES (1, 1)")
+    conn.executemany("""
+        INSERT INTO menu_items (kind, code, label_ko, label_en, label_zh, temperature, sort_order)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, MENU_SEED)
+
+    # 메뉴에 없는 예전 주문 문자열은 판매 종료(retired) 항목으로 보존
+    tables = ["orders"] + [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'orders_history_%'")]
+    for table in tables:
+        for kind in ("salt", "drink"):
+            conn.execute(f"""
+                INSERT OR IGNORE INTO menu_items (kind, code, label_ko, available, retired, sort_order)
+                SELECT DISTINCT ?, {kind}, {kind}, 0, 1, 1000 FROM {table}
+            """, (kind,))
+
+    # 주문은 문자열 대신 메뉴 id 를 저장
+    seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'orders'").fetchone()[0]
+    conn.execute("""
+        CREATE TABLE orders_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            seat TEXT NOT NULL,
+            salt_id INTEGER NOT NULL REFERENCES menu_items (id),
+            drink_id INTEGER NOT NULL REFERENCES menu_items (id),
+            status TEXT NOT NULL DEFAULT '대기 중',
+            created_at TEXT NOT NULL DEFAULT (datetime('now')),
+            updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        INSERT INTO orders_new (id, seat, salt_id, drink_id, status, created_at, updated_at, version)
+        SELECT o.id, o.seat, s.id, d.id, o.status, o.created_at, o.updated_at, o.version
+        FROM orders o
+        JOIN menu_items s ON s.kind = 'salt' AND s.code = o.salt
+        JOIN menu_items d ON d.kind = 'drink' AND d.code = o.drink
+    """)
+    conn.execute("DROP TABLE orders")
+    conn.execute("ALTER TABLE orders_new RENAME TO orders")
+    _replace_sequence(conn, "orders", seq)
+    conn.execute("CREATE INDEX idx_orders_status_seat ON orders (status, seat)")
+    conn.execute("CREATE INDEX idx_orders_created_at ON orders (created_at)")
+    conn.execute("CREATE INDEX idx_orders_version ON orders (version)")
+    for event, columns in (("insert", "INSERT"), ("update", "UPDATE OF seat, salt_id, drink_id, status")):
+        conn.execute(f"""
+            CREATE TRIGGER orders_version_{event} AFTER {columns} ON orders
+            BEGIN
+                UPDATE order_seq SET value = value + 1 WHERE id = 1;
+                UPDATE orders SET version = (SELECT value FROM order_seq WHERE id = 1) WHERE id = NEW.id;
+            END
+        """)
+
+    for table in tables[1:]:
+        conn.execute(f"""
+            CREATE TABLE {table}_new (
+                id INTEGER PRIMARY KEY,
+                seat TEXT NOT NULL,
+                salt_id INTEGER NOT NULL,
+                drink_id INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                archived_at TEXT NOT NULL DEFAULT (datetime('now'))
+            )
+        """)
+        conn.execute(f"""
+            INSERT INTO {table}_new (id, seat, salt_id, drink_id, status, created_at, updated_at, archived_at)
+            SELECT h.id, h.seat, s.id, d.id, h.status, h.created_at, h.updated_at, h.archived_at
+            FROM {table} h
+            JOIN menu_items s ON s.kind = 'salt' AND s.code = h.salt
+            JOIN menu_items d ON d.kind = 'drink' AND d.code = h.drink
+        """)
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+    # 메뉴가 바뀔 때마다 버전을 올림 (워커별 메뉴 캐시와 페이지 캐시 무효화에 사용)
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER menu_items_version_{event.lower()} AFTER {event} ON menu_items
+            BEGIN
+                UPDATE menu_meta SET version = version + 1 WHERE id = 1;
+            END
+        """)
+
+
+MIGRATIONS = [
+    # 1. 최초 주문 테이블
+    [
+        """
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            seat TEXT NOT NULL,
+            salt TEXT NOT NULL,
+            drink TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT '대기 중'
+        )
+        """,
+    ],
+    # 2. 생성/수정 시각 추가 + 관리자 화면 조회용 인덱스
+    [
+        """
+        CREATE TABLE orders_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            seat TEXT NOT NULL,
+            salt TEXT NOT NULL,
+            drink TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT '대기 중',
+            created_at TEXT NOT NULL DEFAULT (datetime('now')),
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        """,
+        "INSERT INTO orders_new (id, seat, salt, drink, status) SELECT id, seat, salt, drink, status FROM orders",
+        # 삭제된 주문 id 가 재사용되지 않도록 AUTOINCREMENT 순번을 옮김 (_replace_sequence 와 같은 이유)
+        "DELETE FROM sqlite_sequence WHERE name = 'orders_new'",
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'orders_new', seq FROM sqlite_sequence WHERE name = 'orders'",
+        "DROP TABLE orders",
+        "ALTER TABLE orders_new RENAME TO orders",
+        "CREATE INDEX idx_orders_status_seat ON orders (status, seat)",
+        "CREATE INDEX idx_orders_created_at ON orders (created_at)",
+    ],
+    # 3. 변경 버전(커서): 주문이 추가/변경될 때마다 전역 순번을 올려 version 에 기록
+    #    archived_through 는 이력 테이블로 옮겨진 주문 중 가장 큰 version
+    [
+        """
+        CREATE TABLE order_seq (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            value INTEGER NOT NULL,
+            archived_through INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "ALTER TABLE orders ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+        "UPDATE orders SET version = id",
+        "INSERT INTO order_seq (id, value) SELECT 1, COALESCE(MAX(version), 0) FROM orders",
+        "CREATE INDEX idx_orders_version ON orders (version)",
+        """
+        CREATE TRIGGER orders_version_insert AFTER INSERT ON orders
+        BEGIN
+            UPDATE order_seq SET value = value + 1 WHERE id = 1;
+            UPDATE orders SET version = (SELECT value FROM order_seq WHERE id = 1) WHERE id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER orders_version_update AFTER UPDATE OF seat, salt, drink, status ON orders
+        BEGIN
+            UPDATE order_seq SET value = value + 1 WHERE id = 1;
+            UPDATE orders SET version = (SELECT value FROM order_seq WHERE id = 1) WHERE id = NEW.id;
+        END
+        """,
+    ],
+    # 4. 메뉴 카탈로그 (menu_items) + 주문에는 메뉴 id 만 저장
+    _menu_catalog,
+    # 5. 주문 멱등 키 (재시도/중복 터치로 같은 주문이 두 번 들어가지 않게)
+    [
+        """
+        CREATE TABLE order_requests (
+            key TEXT PRIMARY KEY,
+            order_id INTEGER NOT NULL,
+            created_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        """,
+        "CREATE INDEX idx_order_requests_created_at ON order_requests (created_at)",
+    ],
+    # 6. 주방/바 준비 대기열: 음료를 만드는 스테이션(hot/cold)과 예상 준비 시간(초)
+    [
+        "ALTER TABLE menu_items ADD COLUMN station TEXT",
+        "ALTER TABLE menu_items ADD COLUMN prep_seconds INTEGER NOT NULL DEFAULT 0",
+        """
+        UPDATE menu_items SET
+            station = CASE WHEN temperature LIKE '%HOT%' THEN 'hot' ELSE 'cold' END,
+            prep_seconds = CASE WHEN temperature LIKE '%HOT%' THEN 180 ELSE 90 END
+        WHERE kind = 'drink'
+        """,
+    ],
+    # 7. 판매 통계 롤업 (시간별/일별) + 기존 주문으로 채우기
+    _stats_rollups,
+    # 8. 주문 이벤트 저널 (추가 전용) + 기존 주문/이력으로 채우기
+    _order_events,
+]
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(db):
+    # BEGIN IMMEDIATE 로 쓰기 락을 먼저 잡으므로 여러 워커가 동시에 실행해도 한 번만 적용됨
+    with db.transaction() as conn:
+        version = current_version(conn)
+        for step in MIGRATIONS[version:]:
+            if callable(step):
+                step(conn)
+                continue
+            for sql in step:
+                conn.execute(sql)
+        if version < len(MIGRATIONS):
+            conn.execute(f"PRAGMA user_version={len(MIGRATIONS)}")
+    return len(MIGRATIONS) - version
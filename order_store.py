@@ -0,0 +1,235 @@
+import re
+
+import stats
+
+# 주문 상태: 대기 중 -> 준비 중 -> 서빙 완료
+# 서빙 완료된 주문은 삭제하지 않고 archive_served() 가 월별 이력 테이블로 옮김
+STATUS_WAITING = "대기 중"
+STATUS_PREPARING = "준비 중"
+STATUS_SERVED = "서빙 완료"
+
+ACTIVE_STATUSES = (STATUS_WAITING, STATUS_PREPARING)
+
+# 허용되는 상태 변경 (대기 중에서 바로 서빙 완료도 가능)
+TRANSITIONS = {
+    STATUS_WAITING: (STATUS_PREPARING, STATUS_SERVED),
+    STATUS_PREPARING: (STATUS_SERVED,),
+    STATUS_SERVED: (),
+}
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+# 판매 통계 롤업도 같은 트랜잭션에서 올림
+def insert_order(conn, seat, salt_id, drink_id):
+    cursor = conn.execute("""
+        INSERT INTO orders (seat, salt_id, drink_id)
+        VALUES (?, ?, ?)
+    """, (seat, salt_id, drink_id))
+    stats.record(conn, seat, salt_id, drink_id)
+    return cursor.lastrowid
+
+
+def active_orders(conn):
+    return conn.execute("""
+        SELECT id, seat, salt_id, drink_id, status, version, created_at, updated_at FROM orders
+        WHERE status IN (?, ?)
+        ORDER BY id
+    """, ACTIVE_STATUSES).fetchall()
+
+
+def order_dict(row):
+    return {"id": row["id"], "seat": row["seat"], "salt_id": row["salt_id"],
+            "drink_id": row["drink_id"], "status": row["status"], "version": row["version"],
+            "created_at": row["created_at"], "updated_at": row["updated_at"]}
+
+
+# cursor 이후에 추가/변경된 주문만 돌려줌 (version 인덱스 사용)
+# cursor 가 0 이거나, 그 사이 이력 테이블로 옮겨진 주문이 있으면 진행 중 주문 전체(reset)를 돌려줌
+# 일관된 결과를 위해 하나의 읽기 트랜잭션 안에서 호출해야 함
+def changes_since(conn, since):
+    cursor, archived_through = conn.execute(
+        "SELECT value, archived_through FROM order_seq WHERE id = 1").fetchone()
+    if since <= 0 or since < archived_through or since > cursor:
+        return cursor, True, [order_dict(row) for row in active_orders(conn)]
+    rows = conn.execute("""
+        SELECT id, seat, salt_id, drink_id, status, version, created_at, updated_at FROM orders
+        WHERE version > ?
+        ORDER BY version
+    """, (since,)).fetchall()
+    return cursor, False, [order_dict(row) for row in rows]
+
+
+def set_status(conn, order_id, status):
+    row = conn.execute("SELECT status FROM orders WHERE id=?", (order_id,)).fetchone()
+    if row is None:
+        return False
+    if status != row["status"] and status not in TRANSITIONS.get(row["status"], ()):
+        raise InvalidTransition(f"{row['status']} -> {status}")
+    conn.execute("""
+        UPDATE orders SET status=?, updated_at=datetime('now') WHERE id=?
+    """, (status, order_id))
+    return True
+
+
+# 활성 주문을 전부 서빙 완료로 바꾸고 바뀐 주문 id 목록을 돌려줌 ("모든 주문 삭제" 버튼)
+def serve_all(conn):
+    ids = [row["id"] for row in conn.execute(
+        "SELECT id FROM orders WHERE status IN (?, ?)", ACTIVE_STATUSES)]
+    conn.execute("""
+        UPDATE orders SET status=?, updated_at=datetime('now') WHERE status IN (?, ?)
+    """, (STATUS_SERVED,) + ACTIVE_STATUSES)
+    return ids
+
+
+# 관리자 일괄 작업 (여러 주문을 한 트랜잭션에서 처리)
+# operations: [{"op": ..., "ids": [...], ...}, ...]
+#   delete / serve : 서빙 완료 처리 (delete 도 기록은 남김)
+#   status         : status 로 변경 (허용된 상태 변경만)
+#   move           : seat 로 자리 이동 (seats: 매장 좌석 배치에 있는 자리만)
+#   edit           : salt_id / drink_id 변경 (resolve(kind, value) 로 메뉴 확인)
+#   clear_seat     : seat 의 진행 중 주문을 모두 서빙 완료
+# 하나라도 실패하면 BulkError 를 던지고, 호출한 쪽 트랜잭션이 전체를 되돌림
+# 바뀐 주문 id 목록을 돌려줌
+class BulkError(ValueError):
+    def __init__(self, index, message):
+        super().__init__(f"{index}번째 작업: {message}")
+        self.index = index
+
+
+# 주문 ID 목록 형식 확인 (정수 목록만, "12" 나 5 처럼 목록이 아니면 안 됨)
+def valid_ids(ids):
+    return isinstance(ids, list) and all(isinstance(order_id, int) and not isinstance(order_id, bool)
+                                         for order_id in ids)
+
+
+def _active_ids(conn, ids, index):
+    if not valid_ids(ids):
+        raise BulkError(index, "주문 ID 가 올바르지 않습니다.")
+    ids = sorted(set(ids))
+    if not ids:
+        raise BulkError(index, "주문 ID 가 없습니다.")
+    placeholders = ", ".join("?" * len(ids))
+    found = {row["id"] for row in conn.execute(
+        f"SELECT id FROM orders WHERE id IN ({placeholders}) AND status IN (?, ?)", ids + list(ACTIVE_STATUSES))}
+    missing = [order_id for order_id in ids if order_id not in found]
+    if missing:
+        raise BulkError(index, f"진행 중인 주문이 아닙니다: {missing}")
+    return ids
+
+
+def _update(conn, ids, assignments, params):
+    placeholders = ", ".join("?" * len(ids))
+    conn.execute(f"UPDATE orders SET {assignments}, updated_at=datetime('now') WHERE id IN ({placeholders})",
+                 list(params) + ids)
+
+
+# 자리/메뉴 변경: 판매 통계 집계도 같은 트랜잭션에서 옮김 (rebuild-stats 결과와 같게)
+def _update_counted(conn, ids, assignments, params):
+    placeholders = ", ".join("?" * len(ids))
+    select = f"SELECT id, seat, salt_id, drink_id, created_at FROM orders WHERE id IN ({placeholders}) ORDER BY id"
+    before = conn.execute(select, ids).fetchall()
+    _update(conn, ids, assignments, params)
+    for old, new in zip(before, conn.execute(select, ids).fetchall()):
+        if (old["seat"], old["salt_id"], old["drink_id"]) != (new["seat"], new["salt_id"], new["drink_id"]):
+            stats.change(conn, old, new)
+
+
+def clear_seat(conn, seat):
+    ids = [row["id"] for row in conn.execute(
+        "SELECT id FROM orders WHERE status IN (?, ?) AND seat=?", ACTIVE_STATUSES + (seat,))]
+    conn.execute("""
+        UPDATE orders SET status=?, updated_at=datetime('now') WHERE status IN (?, ?) AND seat=?
+    """, (STATUS_SERVED,) + ACTIVE_STATUSES + (seat,))
+    return ids
+
+
+def apply_bulk(conn, operations, resolve, seats):
+    changed = []
+    for index, operation in enumerate(operations):
+        op = operation.get("op")
+        if op == "clear_seat":
+            if not operation.get("seat"):
+                raise BulkError(index, "자리 번호가 없습니다.")
+            changed += clear_seat(conn, str(operation["seat"]))
+            continue
+        ids = _active_ids(conn, operation.get("ids", []), index)
+        if op in ("delete", "serve"):
+            _update(conn, ids, "status=?", (STATUS_SERVED,))
+        elif op == "status":
+            status = operation.get("status")
+            try:
+                for order_id in ids:
+                    set_status(conn, order_id, status)
+            except InvalidTransition as e:
+                raise BulkError(index, f"변경할 수 없는 상태입니다. ({e})")
+        elif op == "move":
+            if not operation.get("seat"):
+                raise BulkError(index, "자리 번호가 없습니다.")
+            if str(operation["seat"]) not in seats:
+                raise BulkError(index, f"없는 자리입니다: {operation['seat']}")
+            _update_counted(conn, ids, "seat=?", (str(operation["seat"]),))
+        elif op == "edit":
+            items = {kind: resolve(kind, operation[key]) for kind, key in (("salt", "salt"), ("drink", "drink"))
+                     if operation.get(key) is not None}
+            if not items or any(item is None or item.retired for item in items.values()):
+                raise BulkError(index, "메뉴를 찾을 수 없습니다.")
+            assignments = ", ".join(f"{kind}_id=?" for kind in items)
+            _update_counted(conn, ids, assignments, [item.id for item in items.values()])
+        else:
+            raise BulkError(index, f"알 수 없는 작업입니다: {op!r}")
+        changed += ids
+    return sorted(set(changed))
+
+
+def history_table(month):
+    # month 는 'YYYY-MM' 형식 (테이블 이름에 들어가므로 형식을 반드시 확인)
+    if not re.fullmatch(r"\d{4}-\d{2}", month):
+        raise ValueError(f"잘못된 월 형식: {month!r}")
+    return "orders_history_" + month.replace("-", "")
+
+
+def create_history_table(conn, month):
+    table = history_table(month)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY,
+            seat TEXT NOT NULL,
+            salt_id INTEGER NOT NULL,
+            drink_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            archived_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    """)
+    return table
+
+
+# 서빙 완료 후 일정 시간이 지난 주문을 생성 월별 이력 테이블로 옮김
+# 관리자 화면이 보는 orders 테이블은 항상 작게 유지됨
+def archive_served(conn, older_than_minutes=30):
+    cutoff = f"-{int(older_than_minutes)} minutes"
+    months = [row[0] for row in conn.execute("""
+        SELECT DISTINCT substr(created_at, 1, 7) FROM orders
+        WHERE status=? AND updated_at <= datetime('now', ?)
+    """, (STATUS_SERVED, cutoff))]
+
+    moved = 0
+    for month in months:
+        table = create_history_table(conn, month)
+        where = "status=? AND updated_at <= datetime('now', ?) AND substr(created_at, 1, 7)=?"
+        params = (STATUS_SERVED, cutoff, month)
+        conn.execute(f"""
+            UPDATE order_seq SET archived_through = MAX(archived_through,
+                (SELECT COALESCE(MAX(version), 0) FROM orders WHERE {where}))
+            WHERE id = 1
+        """, params)
+        conn.execute(f"""
+            INSERT OR REPLACE INTO {table} (id, seat, salt_id, drink_id, status, created_at, updated_at)
+            SELECT id, seat, salt_id, drink_id, status, created_at, updated_at FROM orders WHERE {where}
+        """, params)
+        moved += conn.execute(f"DELETE FROM orders WHERE {where}", params).rowcount
+    return moved
@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import Response, current_app, render_template, request
+
+import config
+import metrics
+
+# 앱 시작 시 한 번 컴파일해 두는 페이지 템플릿 목록
+PAGES = {
+    "order": "order.html",
+    "order_complete": "order_complete.html",
+    "admin": "admin.html",
+    "stats": "stats.html",
+    "qr_sheet": "qr_sheet.html",
+    "sw": "sw.js",
+}
+
+_compiled = {}
+
+
+def init_app(app):
+    for name, filename in PAGES.items():
+        _compiled[name] = app.jinja_env.get_template(filename)
+
+
+def render_page(name, **context):
+    # 개발 모드(auto_reload)에서는 파일 수정이 바로 반영되도록 이름으로 렌더링
+    with metrics.timed_template():
+        if current_app.jinja_env.auto_reload:
+            return render_template(PAGES[name], **context)
+        return render_template(_compiled[name], **context)
+
+
+class CachedPage:
+    __slots__ = ("body", "gzipped", "etag")
+
+    def __init__(self, body):
+        self.body = body
+        self.gzipped = gzip.compress(body, mtime=0)
+        self.etag = hashlib.sha1(body).hexdigest()
+
+    # (상태 코드, 헤더 목록, 본문) - Flask 와 ASGI 양쪽에서 같이 사용
+    # gzip 본문은 다른 바이트이므로 ETag 에 -gz 를 붙이고, If-None-Match 는 두 형태 모두 인정
+    # matches(etag): If-None-Match 에 그 ETag 가 있는지
+    def respond(self, matches, accept_gzip, max_age):
+        headers = [
+            ("ETag", f'"{self.etag}-gz"' if accept_gzip else f'"{self.etag}"'),
+            ("Cache-Control", f"public, max-age={max_age}"),
+            ("Vary", "Accept-Encoding"),
+        ]
+        if matches(self.etag) or matches(f"{self.etag}-gz"):
+            return 304, headers, b""
+        headers.append(("Content-Type", "text/html; charset=utf-8"))
+        if accept_gzip:
+            headers.append(("Content-Encoding", "gzip"))
+            return 200, headers, self.gzipped
+        return 200, headers, self.body
+
+
+# 완성된 페이지 바이트를 보관하는 LRU 캐시 (매장마다 따로, 매장당 최대 maxsize 개)
+# 키에 메뉴 버전이 들어가므로 메뉴가 바뀌면 예전 항목은 더 이상 조회되지 않고 LRU 로 밀려남
+# 매장마다 메뉴 버전과 LRU 가 따로라서 다른 매장의 메뉴 변경이나 페이지가 이 매장 캐시를 밀어내지 않음
+class PageCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._stores = {}  # 매장 키 -> OrderedDict
+        self._lock = threading.Lock()
+
+    def get(self, store_key, key, version):
+        with self._lock:
+            entries = self._stores.get(store_key)
+            entry = entries.get((version,) + key) if entries is not None else None
+            if entry is not None:
+                entries.move_to_end((version,) + key)
+            return entry
+
+    def put(self, store_key, key, version, entry):
+        with self._lock:
+            entries = self._stores.setdefault(store_key, OrderedDict())
+            entries[(version,) + key] = entry
+            entries.move_to_end((version,) + key)
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+
+    # 매장을 닫을 때 (StoreRegistry 에서 밀려난 매장)
+    def drop(self, store_key):
+        with self._lock:
+            self._stores.pop(store_key, None)
+
+    def clear(self):
+        with self._lock:
+            self._stores.clear()
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._stores.values())
+
+
+page_cache = PageCache(config.PAGE_CACHE_SIZE)
+
+
+def page_key(name, context):
+    return (name,) + tuple(sorted(context.items()))
+
+
+# 캐시된 페이지를 strong ETag 와 함께 응답 (If-None-Match 가 맞으면 304)
+def cached_page(name, version, max_age=0, **context):
+    key = page_key(name, context)
+    entry = page_cache.get(context["store_key"], key, version)
+    if entry is None:
+        entry = CachedPage(render_page(name, **context).encode("utf-8"))
+        page_cache.put(context["store_key"], key, version, entry)
+
+    status, headers, body = entry.respond(
+        request.if_none_match.contains,
+        bool(request.accept_encodings["gzip"]),
+        max_age,
+    )
+    return Response(body, status=status, headers=headers)
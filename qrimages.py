@@ -0,0 +1,99 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import config
+
+try:
+    import qrcode
+    import qrcode.image.pure
+    import qrcode.image.svg
+except ImportError:  # qrcode 는 선택 사항 (pip install qrcode, PNG 는 pillow 또는 pypng 도 필요) - 없으면 QR 이미지 API 가 501
+    qrcode = None
+
+FORMATS = {"svg": "image/svg+xml", "png": "image/png"}
+
+
+class QRUnavailable(RuntimeError):
+    pass
+
+
+class QRImage:
+    __slots__ = ("body", "etag", "mimetype")
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.mimetype = mimetype
+
+    # 인쇄용 시트에 바로 넣을 SVG 태그 (XML 선언 제외)
+    def inline(self):
+        text = self.body.decode("utf-8")
+        return text.split("?>", 1)[1].lstrip() if text.startswith("<?xml") else text
+
+
+def render(data, fmt):
+    if qrcode is None:
+        raise QRUnavailable("qrcode 패키지가 설치되어 있지 않습니다. (pip install qrcode)")
+    qr = qrcode.QRCode(error_correction=qrcode.ERROR_CORRECT_M, box_size=config.QR_BOX_SIZE)
+    qr.add_data(data)
+    qr.make(fit=True)
+    try:
+        if fmt == "svg":
+            image = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+        else:
+            try:
+                image = qr.make_image()
+            except ImportError:
+                # pillow 가 없으면 순수 파이썬 PNG (pypng)
+                image = qr.make_image(image_factory=qrcode.image.pure.PyPNGImage)
+    except ImportError:
+        raise QRUnavailable("PNG QR 코드에는 pillow 또는 pypng 패키지가 필요합니다.")
+    out = io.BytesIO()
+    image.save(out)
+    return out.getvalue()
+
+
+# QR 이미지 캐시: 메모리(LRU) -> 디스크(QR_CACHE_DIR) -> 렌더링 순서로 찾음
+# 키는 (형식, 크기, 링크 주소) 의 해시라 좌석 배치, 서명 키, 주소가 바뀌면 새 이미지를 만들고 예전 것은 쓰이지 않음
+class QRCache:
+    def __init__(self, directory=None, maxsize=None):
+        self.directory = directory or config.QR_CACHE_DIR
+        self.maxsize = maxsize or config.QR_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, data, fmt):
+        key = hashlib.sha256(f"{fmt}:{config.QR_BOX_SIZE}:{data}".encode()).hexdigest()[:32]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        path = os.path.join(self.directory, f"{key}.{fmt}")
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            body = render(data, fmt)
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(f"{path}.{os.getpid()}.tmp", "wb") as f:
+                    f.write(body)
+                os.replace(f"{path}.{os.getpid()}.tmp", path)
+            except OSError:
+                pass  # 디스크에 못 써도 메모리 캐시로 응답
+
+        entry = QRImage(body, FORMATS[fmt])
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+
+images = QRCache()
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import config
+from db import Database
+
+
+# 토큰 버킷 요청 제한
+# 버킷 상태는 작은 SQLite 파일(RATE_LIMIT_DB_FILE)에 두어 gunicorn 워커끼리 공유하고,
+# 한 번 거절된 키는 다시 채워질 때까지 워커 메모리에서 바로 거절함 (DB 를 건드리지 않음)
+class Limiter:
+    def __init__(self, path=None, rules=None):
+        self.rules = rules if rules is not None else config.RATE_LIMITS
+        self.path = path or config.RATE_LIMIT_DB_FILE
+        self._db = None
+        self._lock = threading.Lock()
+        self._blocked = {}  # 키 -> 다시 허용되는 시각
+        self._hits = 0
+
+    @property
+    def db(self):
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    # 잃어버려도 되는 상태라 fsync 하지 않음
+                    db = Database(self.path, pool_size=4, synchronous="OFF")
+                    with db.transaction() as conn:
+                        conn.execute("""
+                            CREATE TABLE IF NOT EXISTS buckets (
+                                key TEXT PRIMARY KEY,
+                                tokens REAL NOT NULL,
+                                updated REAL NOT NULL
+                            ) WITHOUT ROWID
+                        """)
+                    self._db = db
+        return self._db
+
+    # 여러 규칙(checks: [(규칙 이름, 키), ...])을 한 번에 확인하고, 모두 허용일 때만 규칙마다 토큰을 하나씩 사용
+    # 허용이면 None, 거절이면 처음 거절된 규칙에서 다시 시도할 수 있을 때까지 남은 초 (규칙이 설정에 없으면 건너뜀)
+    def check(self, checks):
+        checks = [(rule, f"{rule}:{key}") for rule, key in checks if rule in self.rules]
+        now = time.time()
+
+        for _, bucket in checks:
+            blocked_until = self._blocked.get(bucket)
+            if blocked_until is not None:
+                if blocked_until > now:
+                    return blocked_until - now
+                self._blocked.pop(bucket, None)
+
+        with self.db.transaction() as conn:
+            spent = []
+            for rule, bucket in checks:
+                capacity, period = self.rules[rule]
+                rate = capacity / period
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE key=?", (bucket,)).fetchone()
+                tokens = capacity if row is None else min(capacity, row["tokens"] + (now - row["updated"]) * rate)
+                if tokens < 1:
+                    # 앞선 규칙의 토큰도 쓰지 않음 (아무것도 기록하지 않고 끝냄)
+                    retry_after = (1 - tokens) / rate
+                    self._blocked[bucket] = now + retry_after
+                    return retry_after
+                spent.append((bucket, tokens - 1, now))
+            conn.executemany("""
+                INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET tokens=excluded.tokens, updated=excluded.updated
+            """, spent)
+        self._maybe_prune(now)
+        return None
+
+    # 가득 찬 버킷은 행이 없는 것과 같으므로 가끔 정리
+    def _maybe_prune(self, now):
+        self._hits += 1
+        if self._hits % 1000:
+            return
+        longest = max(period for _, period in self.rules.values())
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM buckets WHERE updated < ?", (now - longest,))
+        for bucket, until in list(self._blocked.items()):
+            if until <= now:
+                self._blocked.pop(bucket, None)
+
+
+limiter = Limiter()
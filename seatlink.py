@@ -0,0 +1,74 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+
+import config
+
+# 서명된 좌석 링크: /order?seat=<좌석>&t=<서명>
+# 서명은 (매장 키, 좌석 번호) 의 HMAC-SHA256 앞 12바이트 (URL 에 16글자)
+# 좌석 번호나 매장을 바꾼 링크는 DB 를 건드리기 전에 거절됨
+# 서명 키는 SEAT_LINK_SECRET, 없으면 SEAT_LINK_SECRET_FILE 에 한 번 만들어서 모든 워커가 같이 씀
+# (키를 바꾸면 예전 QR 코드는 모두 무효가 되므로 다시 인쇄해야 함)
+
+_secret = None
+_lock = threading.Lock()
+
+
+def _load_or_create(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # 임시 파일에 쓴 뒤 link 로 붙여서, 여러 워커가 동시에 만들어도 먼저 붙인 키 하나만 쓰임
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(secrets.token_urlsafe(32))
+    try:
+        os.chmod(tmp, 0o600)
+        os.link(tmp, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp)
+    with open(path) as f:
+        return f.read().strip()
+
+
+def secret():
+    global _secret
+    if _secret is None:
+        with _lock:
+            if _secret is None:
+                _secret = (config.SEAT_LINK_SECRET or _load_or_create(config.SEAT_LINK_SECRET_FILE)).encode()
+    return _secret
+
+
+def token(store_key, seat):
+    digest = hmac.new(secret(), f"{store_key}\0{seat}".encode(), hashlib.sha256).digest()[:12]
+    return base64.urlsafe_b64encode(digest).decode()
+
+
+def verify(store_key, seat, value):
+    return hmac.compare_digest(token(store_key, seat).encode(), (value or "").encode())
+
+
+def has_seat(store, seat):
+    return seat in {str(number) for number in store.seats}
+
+
+# 주문 링크 검사: 잘못된 링크면 오류 메시지, 괜찮으면 None
+# - 매장 좌석 배치에 없는 좌석은 항상 거절
+# - 서명이 있으면 맞아야 하고, SEAT_LINKS_REQUIRED 이면 서명 없는 예전 링크도 거절
+def check(store, seat, value):
+    if not has_seat(store, seat):
+        return "없는 좌석입니다."
+    if value:
+        return None if verify(store.key, seat, value) else "좌석 링크가 올바르지 않습니다."
+    if config.SEAT_LINKS_REQUIRED:
+        return "좌석 링크가 올바르지 않습니다."
+    return None
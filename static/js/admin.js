@@ -0,0 +1,185 @@
+// 매장 URL 앞부분 (/s/<매장 키>), 호스트 이름으로 구분하는 경우에는 빈 문자열
+const ROOT = document.body.dataset.root || "";
+
+function deleteOrder(orderId) {
+    fetch(ROOT + '/delete-order', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ id: orderId })
+    }).then(() => sync());
+}
+function setStatus(orderId, status) {
+    fetch(ROOT + '/order-status', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ id: orderId, status: status })
+    }).then(() => sync());
+}
+function deleteAllOrders() {
+    fetch(ROOT + '/delete-all-orders', {
+        method: 'POST'
+    }).then(() => sync());
+}
+// 일괄 작업 (한 요청, 한 트랜잭션)
+function bulk(operations) {
+    return fetch(ROOT + '/admin/bulk', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ operations: operations })
+    }).then(res => res.json()).then(data => {
+        if (data.error) alert(data.error);
+        sync();
+    });
+}
+// 자리 비우기: 그 자리의 진행 중 주문을 모두 서빙 완료 처리
+function clearSeat(seat) {
+    if (!confirm(seat + "번 자리의 주문을 모두 정리할까요?")) return;
+    bulk([{ op: "clear_seat", seat: seat }]);
+}
+
+// 화면에 그려진 주문이 곧 클라이언트 상태이고, 서버에서 받은 변경분만 반영함 (전체 새로고침 없음)
+function escapeHtml(text) {
+    const div = document.createElement("div");
+    div.textContent = text;
+    return div.innerHTML;
+}
+function refreshSeat(seatEl) {
+    seatEl.classList.toggle("occupied", seatEl.querySelector(".order") !== null);
+}
+function addOrder(order) {
+    if (document.querySelector('.order[data-id="' + order.id + '"]')) return;
+    const seatEl = document.querySelector('.seat[data-seat="' + order.seat + '"]');
+    if (!seatEl) return;
+    const el = document.createElement("div");
+    el.className = "order";
+    el.dataset.id = order.id;
+    el.dataset.status = order.status;
+    el.innerHTML = "<div>" + escapeHtml(order.salt) + "</div>"
+        + "<div>" + escapeHtml(order.drink) + "</div>"
+        + (order.status === "대기 중"
+            ? '<button class="prepare-btn" onclick="setStatus(' + order.id + ', \'준비 중\')">준비</button>'
+            : "")
+        + '<button class="delete-btn" onclick="deleteOrder(' + order.id + ')">삭제</button>';
+    seatEl.appendChild(el);
+    refreshSeat(seatEl);
+}
+function removeOrder(orderId) {
+    const el = document.querySelector('.order[data-id="' + orderId + '"]');
+    if (!el) return;
+    const seatEl = el.parentElement;
+    el.remove();
+    refreshSeat(seatEl);
+}
+function clearOrders() {
+    document.querySelectorAll(".order").forEach(el => el.remove());
+    document.querySelectorAll(".seat").forEach(refreshSeat);
+}
+// 바뀐 주문은 지우고 다시 그림 (상태뿐 아니라 자리 이동, 메뉴 변경도 있음)
+// 서빙 완료된 주문은 화면에서 내림
+function applyOrder(order) {
+    removeOrder(order.id);
+    if (order.status !== "서빙 완료") {
+        addOrder(order);
+    }
+}
+
+// 마지막으로 반영한 변경 커서 이후의 변경분만 받아와서 적용 (처음에는 0 이라 전체를 받음)
+let cursor = 0;
+let syncing = null;
+let pending = false;
+function sync() {
+    if (syncing) {
+        pending = true;
+        return syncing;
+    }
+    syncing = fetch(ROOT + '/api/orders?since=' + cursor)
+        .then(res => res.json())
+        .then(data => {
+            if (data.reset) clearOrders();
+            data.orders.forEach(applyOrder);
+            cursor = data.cursor;
+        })
+        .catch(() => {})
+        .finally(() => {
+            syncing = null;
+            if (pending) {
+                pending = false;
+                sync();
+            }
+        });
+    return syncing;
+}
+
+// 주문 이벤트(SSE)는 "변경 있음" 신호로만 쓰고, 실제 내용은 커서 기반으로 받아옴
+// 그래서 연결이 끊겼다 다시 붙어도 놓친 변경분까지 그대로 따라잡음
+const events = new EventSource(ROOT + "/admin/events");
+// orders-changed: 다른 워커 프로세스에서 생긴 변경 (서버가 주문 변경 순번을 감시해서 보냄)
+["order-created", "order-deleted", "order-status", "orders-cleared", "orders-bulk", "orders-changed"].forEach(type => {
+    events.addEventListener(type, () => sync());
+});
+events.onopen = () => sync();
+// 이벤트 연결이 끊겨 있는 동안을 위한 안전망
+setInterval(sync, 30000);
+sync();
+
+function toggleMasterForm() {
+    const form = document.getElementById("master-order-form");
+    form.style.display = form.style.display === "none" ? "block" : "none";
+}
+
+function toggleMenuForm() {
+    const form = document.getElementById("menu-form");
+    form.style.display = form.style.display === "none" ? "block" : "none";
+}
+
+// 체크 해제 = 품절. 실패하면 체크 상태를 되돌림
+function setAvailability(itemId, checkbox) {
+    fetch(ROOT + '/admin/menu-availability', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ id: itemId, available: checkbox.checked })
+    }).then(res => {
+        if (!res.ok) checkbox.checked = !checkbox.checked;
+    }).catch(() => { checkbox.checked = !checkbox.checked; });
+}
+
+// 같은 내용으로 다시 보내는 마스터 주문(응답 전에 두 번 누르기, 재시도)은 같은 키를 사용
+let masterOrder = { body: null, key: null };
+
+function submitMasterOrder() {
+    const seat = document.getElementById("master-seat").value;
+    const salt = document.getElementById("master-salt").value;
+    const drink = document.getElementById("master-drink").value;
+
+    if (!seat || !salt || !drink) {
+        alert("모든 항목을 선택해주세요.");
+        return;
+    }
+
+    const body = JSON.stringify({ seat: seat, saltType: salt, drink: drink });
+    if (masterOrder.body !== body) {
+        masterOrder = { body: body, key: newOrderKey() };
+    }
+    const current = masterOrder;
+    fetch(ROOT + '/master-order', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': current.key },
+        body: body
+    }).then(res => {
+        // 응답을 받았으면(성공/거절) 다음 주문은 새 키로 보냄
+        if (masterOrder === current) {
+            masterOrder = { body: null, key: null };
+        }
+        return res.json();
+    }).then(data => {
+        alert(data.message || data.error);
+        sync();
+    }).catch(() => alert("주문 전송에 실패했습니다. 다시 시도해주세요."));
+}
+
+function newOrderKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + "-" + Math.random().toString(36).slice(2, 12);
+}
@@ -0,0 +1,14 @@
+// 서비스 워커 등록 (손님 화면 공통)
+// 등록이 끝나면 지금 페이지 주소를 캐시에 넣어서 다음에 오프라인으로 열어도 보이게 함
+function registerServiceWorker() {
+    if (!("serviceWorker" in navigator)) {
+        return;
+    }
+    const root = document.body.dataset.root || "";
+    navigator.serviceWorker.register(root + "/sw.js", { scope: root + "/" })
+        .then(() => navigator.serviceWorker.ready)
+        .then(registration => registration.active.postMessage({ type: "cache", urls: [window.location.href] }))
+        .catch(() => {});
+}
+
+registerServiceWorker();
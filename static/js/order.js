@@ -0,0 +1,154 @@
+// 주문 시도마다 키를 하나 만들어서, 재시도나 두 번 누르기로 같은 주문이 다시 들어가지 않게 함
+// 주문이 거절되면(품절 등) 다음 주문은 새 키를 사용
+let orderKey = null;
+
+// 보내지 못한 주문 대기열 (localStorage, 페이지를 다시 열어도 유지)
+// 항목: { url, key, body, seat, attempts, next }
+const QUEUE_KEY = "qr-order-queue";
+const MAX_BACKOFF_MS = 60000;
+let replayTimer = null;
+
+function newOrderKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + "-" + Math.random().toString(36).slice(2, 12);
+}
+
+function loadQueue() {
+    try {
+        return JSON.parse(localStorage.getItem(QUEUE_KEY)) || [];
+    } catch (e) {
+        return [];
+    }
+}
+
+function saveQueue(queue) {
+    try {
+        localStorage.setItem(QUEUE_KEY, JSON.stringify(queue));
+    } catch (e) {
+        // 저장 공간이 없으면 이번 페이지에서만 재전송
+    }
+    document.getElementById("offline-status").hidden = queue.length === 0;
+}
+
+function sendOrder(entry) {
+    return fetch(entry.url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': entry.key },
+        body: entry.body
+    });
+}
+
+// 다시 보내면 되는 실패인지 (요청 제한, 서버 오류)
+function isRetryable(res) {
+    return res.status === 429 || res.status >= 500;
+}
+
+function showComplete(seat) {
+    window.location.href = document.body.dataset.root + "/order-complete?seat=" + encodeURIComponent(seat);
+}
+
+// 같은 키의 주문은 하나만 대기열에 둠 (서버도 같은 키는 한 번만 저장함)
+function enqueue(entry, delay) {
+    const queue = loadQueue().filter(item => item.key !== entry.key);
+    entry.attempts = (entry.attempts || 0) + 1;
+    entry.next = Date.now() + (delay !== undefined ? delay : backoff(entry.attempts));
+    queue.push(entry);
+    saveQueue(queue);
+    scheduleReplay();
+}
+
+function dequeue(key) {
+    saveQueue(loadQueue().filter(item => item.key !== key));
+}
+
+// 1초, 2초, 4초 ... 최대 1분 + 약간의 무작위 지연 (여러 손님이 동시에 다시 보내지 않게)
+function backoff(attempts) {
+    return Math.min(MAX_BACKOFF_MS, 1000 * 2 ** (attempts - 1)) + Math.random() * 1000;
+}
+
+function retryAfter(res) {
+    const seconds = parseInt(res.headers.get("Retry-After"), 10);
+    return isNaN(seconds) ? undefined : seconds * 1000;
+}
+
+function scheduleReplay() {
+    const queue = loadQueue();
+    clearTimeout(replayTimer);
+    if (queue.length === 0) {
+        return;
+    }
+    const next = Math.min(...queue.map(item => item.next));
+    replayTimer = setTimeout(replayQueue, Math.max(0, next - Date.now()));
+}
+
+// 대기열의 주문을 다시 보냄. 하나라도 성공하면 주문 완료 화면으로 이동
+function replayQueue() {
+    const now = Date.now();
+    const due = loadQueue().filter(item => item.next <= now);
+    if (due.length === 0) {
+        scheduleReplay();
+        return;
+    }
+    Promise.all(due.map(entry => sendOrder(entry).then(res => {
+        if (res.ok) {
+            dequeue(entry.key);
+            return entry.seat;
+        }
+        if (isRetryable(res)) {
+            enqueue(entry, retryAfter(res));
+            return null;
+        }
+        // 품절 등으로 거절된 주문은 버리고 안내
+        dequeue(entry.key);
+        return res.json().then(data => { alert(data.error); return null; });
+    }).catch(() => {
+        enqueue(entry);
+        return null;
+    }))).then(seats => {
+        const done = seats.find(seat => seat !== null);
+        if (done !== undefined) {
+            showComplete(done);
+        } else {
+            scheduleReplay();
+        }
+    });
+}
+
+function placeOrder() {
+    let salt = document.getElementById('salt').value;
+    let drink = document.getElementById('drink').value;
+    orderKey = orderKey || newOrderKey();
+    const entry = {
+        url: window.location.href,
+        key: orderKey,
+        body: JSON.stringify({ saltType: salt, drink: drink }),
+        seat: document.body.dataset.seat
+    };
+    sendOrder(entry).then(res => {
+        if (res.ok) {
+            dequeue(entry.key);
+            showComplete(entry.seat);
+            return;
+        }
+        if (isRetryable(res)) {
+            enqueue(entry, retryAfter(res));
+            return;
+        }
+        // 품절 등으로 주문이 거절된 경우 안내만 하고 페이지에 남음
+        orderKey = null;
+        return res.json().then(data => alert(data.error));
+    }).catch(() => {
+        // 네트워크 오류: 대기열에 넣고 연결되면 같은 키로 다시 보냄 (서버에서 중복 제거)
+        enqueue(entry);
+    });
+}
+
+// 연결이 돌아오면 기다리지 않고 바로 다시 보냄
+window.addEventListener("online", () => {
+    saveQueue(loadQueue().map(item => Object.assign(item, { next: 0 })));
+    replayQueue();
+});
+saveQueue(loadQueue());
+replayQueue();
@@ -0,0 +1,45 @@
+// 예상 대기 시간 표시 (페이지는 캐시되므로 값만 주기적으로 가져옴)
+function showWait() {
+    const seat = document.body.dataset.seat;
+    fetch(document.body.dataset.root + "/api/wait?seat=" + encodeURIComponent(seat))
+        .then(res => res.json())
+        .then(data => {
+            const el = document.getElementById("wait-estimate");
+            if (data.wait_seconds === null) {
+                el.hidden = true;
+                return;
+            }
+            const minutes = Math.max(1, Math.round(data.wait_seconds / 60));
+            el.textContent = `예상 대기 시간: 약 ${minutes}분 | Estimated wait: about ${minutes} min | 预计等待: 约${minutes}分钟`;
+            el.hidden = false;
+        })
+        .catch(() => {});
+}
+
+showWait();
+setInterval(showWait, 30000);
+
+// 광고 스크립트는 주문 완료 화면이 다 그려진 뒤에 불러옴 (렌더링을 막지 않게)
+// <template class="lazy-ad"> 안의 내용을 그 자리에 넣고, 스크립트는 원래 순서대로 하나씩 실행
+function insertAdNode(template, node) {
+    if (node.nodeName !== "SCRIPT") {
+        template.parentNode.insertBefore(node, template);
+        return Promise.resolve();
+    }
+    const script = document.createElement("script");
+    Array.from(node.attributes).forEach(attr => script.setAttribute(attr.name, attr.value));
+    script.text = node.text;
+    const loaded = new Promise(resolve => { script.onload = script.onerror = resolve; });
+    template.parentNode.insertBefore(script, template);
+    return script.src ? loaded : Promise.resolve();
+}
+
+function loadAds() {
+    document.querySelectorAll("template.lazy-ad").forEach(template => {
+        Array.from(template.content.childNodes)
+            .map(node => node.cloneNode(true))
+            .reduce((chain, node) => chain.then(() => insertAdNode(template, node)), Promise.resolve());
+    });
+}
+
+window.addEventListener("load", () => (window.requestIdleCallback || setTimeout)(loadAds));
@@ -0,0 +1,117 @@
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+
+import config
+
+# 판매 통계 롤업
+# 주문이 들어올 때마다 같은 쓰기 트랜잭션에서 시간별/일별 집계 행의 주문 수를 하나 올림
+# 통계 화면은 주문 테이블(이력 테이블 포함)을 훑지 않고 집계 테이블만 읽음
+# 시간/날짜는 매장 현지 시각 (STATS_UTC_OFFSET_HOURS)
+
+DIMENSIONS = ("drink_id", "salt_id", "seat")
+
+
+def local_now():
+    return datetime.now(timezone(timedelta(hours=config.STATS_UTC_OFFSET_HOURS)))
+
+
+# SQLite datetime('now') 형식(UTC) 의 시각을 매장 현지 시각으로
+def local_time(value):
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).astimezone(local_now().tzinfo)
+
+
+def _add(conn, seat, salt_id, drink_id, when, delta):
+    params = (seat, salt_id, drink_id)
+    for table, column, key in (("stats_hourly", "hour", when.strftime("%Y-%m-%d %H")),
+                               ("stats_daily", "day", when.strftime("%Y-%m-%d"))):
+        conn.execute(f"""
+            INSERT INTO {table} ({column}, seat, salt_id, drink_id, orders) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT ({column}, seat, salt_id, drink_id) DO UPDATE SET orders = orders + excluded.orders
+        """, (key,) + params + (delta,))
+        if delta < 0:
+            conn.execute(f"""
+                DELETE FROM {table} WHERE {column} = ? AND seat = ? AND salt_id = ? AND drink_id = ? AND orders <= 0
+            """, (key,) + params)
+
+
+def record(conn, seat, salt_id, drink_id, when=None):
+    _add(conn, seat, salt_id, drink_id, when or local_now(), 1)
+
+
+# 주문의 자리/메뉴가 바뀌었을 때 (관리자 일괄 작업, 저널 재적용): 예전 값에서 빼고 새 값에 더함
+# 집계 시각은 rebuild() 처럼 주문 시각(created_at) 기준
+def change(conn, before, after):
+    when = local_time(before["created_at"])
+    _add(conn, before["seat"], before["salt_id"], before["drink_id"], when, -1)
+    _add(conn, after["seat"], after["salt_id"], after["drink_id"], when, 1)
+
+
+# 주문/이력 테이블 전체로 집계를 다시 만듦 (마이그레이션, flask rebuild-stats)
+def rebuild(conn):
+    offset = f"{int(config.STATS_UTC_OFFSET_HOURS):+d} hours"
+    tables = ["orders"] + [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'orders_history_%'")]
+    source = " UNION ALL ".join(
+        f"SELECT seat, salt_id, drink_id, datetime(created_at, ?) AS local FROM {table}" for table in tables)
+    params = (offset,) * len(tables)
+    conn.execute("DELETE FROM stats_hourly")
+    conn.execute("DELETE FROM stats_daily")
+    conn.execute(f"""
+        INSERT INTO stats_hourly (hour, seat, salt_id, drink_id, orders)
+        SELECT substr(local, 1, 13), seat, salt_id, drink_id, COUNT(*) FROM ({source})
+        GROUP BY 1, 2, 3, 4
+    """, params)
+    conn.execute("""
+        INSERT INTO stats_daily (day, seat, salt_id, drink_id, orders)
+        SELECT substr(hour, 1, 10), seat, salt_id, drink_id, SUM(orders) FROM stats_hourly
+        GROUP BY 1, 2, 3, 4
+    """)
+
+
+# 오래된 시간별 집계 삭제 (일별 집계는 계속 보관)
+def prune_hourly(conn, keep_days=None):
+    keep_days = keep_days or config.STATS_HOURLY_DAYS
+    cutoff = (local_now() - timedelta(days=keep_days)).strftime("%Y-%m-%d")
+    return conn.execute("DELETE FROM stats_hourly WHERE hour < ?", (cutoff,)).rowcount
+
+
+# 기간(시작일~종료일, 'YYYY-MM-DD') 요약: 메뉴/좌석별, 날짜별, 시간대별 주문 수
+def report(conn, start, end):
+    def totals(column):
+        return conn.execute(f"""
+            SELECT {column} AS key, SUM(orders) AS orders FROM stats_daily
+            WHERE day BETWEEN ? AND ? GROUP BY {column} ORDER BY orders DESC, key
+        """, (start, end)).fetchall()
+
+    result = {dimension: totals(dimension) for dimension in DIMENSIONS}
+    result["day"] = totals("day")
+    result["day"].sort(key=lambda row: row["key"])
+    result["hour"] = conn.execute("""
+        SELECT substr(hour, 12, 2) AS key, SUM(orders) AS orders FROM stats_hourly
+        WHERE hour BETWEEN ? AND ? GROUP BY key ORDER BY key
+    """, (start + " 00", end + " 23")).fetchall()
+    result["total"] = sum(row["orders"] for row in result["day"])
+    return result
+
+
+# CSV 내보내기 (by = 'day' 또는 'hour'), 엑셀에서 한글이 깨지지 않도록 BOM 포함
+def export_csv(conn, start, end, menu, by="day"):
+    if by == "hour":
+        rows = conn.execute("""
+            SELECT hour AS period, seat, salt_id, drink_id, orders FROM stats_hourly
+            WHERE hour BETWEEN ? AND ? ORDER BY hour, seat, salt_id, drink_id
+        """, (start + " 00", end + " 23"))
+    else:
+        rows = conn.execute("""
+            SELECT day AS period, seat, salt_id, drink_id, orders FROM stats_daily
+            WHERE day BETWEEN ? AND ? ORDER BY day, seat, salt_id, drink_id
+        """, (start, end))
+    out = io.StringIO()
+    out.write("\ufeff")
+    writer = csv.writer(out)
+    writer.writerow([by, "seat", "salt", "drink", "orders"])
+    for row in rows:
+        writer.writerow([row["period"], row["seat"], menu.label(row["salt_id"]),
+                         menu.label(row["drink_id"]), row["orders"]])
+    return out.getvalue()
@@ -0,0 +1,165 @@
+import logging
+import threading
+
+import catalog
+import config
+import dedup
+import journal
+import order_store
+import stats
+from db import Database, MemoryDatabase
+
+logger = logging.getLogger(__name__)
+
+# 저장 엔진
+# - sqlite: 파일 SQLite (WAL), 여러 워커 프로세스가 같은 파일을 함께 사용
+# - memory: 프로세스 메모리 안의 SQLite + 주기적인 디스크 스냅샷 (워커 1개 전용, 디스크 I/O 없음)
+ENGINES = {
+    "sqlite": Database,
+    "memory": MemoryDatabase,
+}
+
+
+def open_database(path, engine=None):
+    engine = engine or config.STORAGE_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"알 수 없는 저장 엔진: {engine!r}")
+    return ENGINES[engine](path)
+
+
+# 주문 저장소 인터페이스
+# 라우트는 SQL 이나 트랜잭션을 직접 다루지 않고 이 메서드만 사용함 (엔진과 무관하게 같은 동작)
+# 주문 INSERT 는 그룹 커밋 큐로, 나머지 쓰기는 각자 하나의 트랜잭션으로 처리
+# 주문을 바꾸는 메서드는 커밋 후 저널(있으면)에 알려서 새 이벤트가 파일에 기록되게 함
+class Storage:
+    def __init__(self, db, write_queue, journal=None):
+        self.db = db
+        self.write_queue = write_queue
+        self.journal = journal
+        self.recent_keys = dedup.RecentKeys()
+
+    def _journal(self):
+        if self.journal is not None:
+            self.journal.notify()
+
+    # 주문
+
+    # 같은 멱등 키로 이미 저장된 주문 id (워커 메모리 -> DB 순서로 확인, 없으면 None)
+    def find_order(self, key):
+        if key is None:
+            return None
+        order_id = self.recent_keys.get(key)
+        if order_id is None:
+            with self.db.connection() as conn:
+                order_id = dedup.lookup(conn, key)
+            if order_id is not None:
+                self.recent_keys.put(key, order_id)
+        return order_id
+
+    # (주문 id, 새로 저장했는지)
+    # key 가 있으면 쓰기 트랜잭션 안에서 한 번 더 확인해서, 동시에 들어온 중복은 처음 주문 id 만 돌려줌
+    def create_order(self, seat, salt_id, drink_id, key=None):
+        insert = lambda conn: order_store.insert_order(conn, seat, salt_id, drink_id)
+        if key is None:
+            order_id, created = self.write_queue.execute(insert), True
+        else:
+            order_id, created = self.write_queue.execute(lambda conn: dedup.insert_once(conn, key, insert))
+            self.recent_keys.put(key, order_id)
+        if created:
+            self._journal()
+        return order_id, created
+
+    # (커서, 전체 다시 받기 여부, 바뀐 주문 목록)
+    def changes(self, since):
+        with self.db.transaction(immediate=False) as conn:
+            return order_store.changes_since(conn, since)
+
+    def set_status(self, order_id, status):
+        with self.db.transaction() as conn:
+            result = order_store.set_status(conn, order_id, status)
+        self._journal()
+        return result
+
+    def serve_all(self):
+        with self.db.transaction() as conn:
+            result = order_store.serve_all(conn)
+        self._journal()
+        return result
+
+    def bulk(self, operations, resolve, seats):
+        with self.db.transaction() as conn:
+            result = order_store.apply_bulk(conn, operations, resolve, seats)
+        self._journal()
+        return result
+
+    # 서빙 완료된 주문을 이력 테이블로 옮기고 만료된 멱등 키, 오래된 시간별 통계도 정리
+    def archive(self, older_than_minutes):
+        with self.db.transaction() as conn:
+            moved = order_store.archive_served(conn, older_than_minutes)
+            dedup.prune(conn)
+            stats.prune_hourly(conn)
+        if moved:
+            self._journal()
+        return moved
+
+    # 메뉴
+
+    def menu(self):
+        return catalog.catalogs.get(self.db)
+
+    def set_available(self, item_id, available):
+        with self.db.transaction() as conn:
+            found = catalog.set_available(conn, item_id, available)
+        # 이 워커는 바로 반영, 다른 워커는 CATALOG_CHECK_SECONDS 안에 반영됨
+        catalog.catalogs.invalidate(self.db)
+        return found
+
+    # 통계
+
+    def stats_report(self, start, end):
+        with self.db.transaction(immediate=False) as conn:
+            return stats.report(conn, start, end)
+
+    def stats_csv(self, start, end, menu, by="day"):
+        with self.db.transaction(immediate=False) as conn:
+            return stats.export_csv(conn, start, end, menu, by=by)
+
+    # 주문 하나의 이벤트 이력 (접수부터 이력 테이블로 옮길 때까지)
+    def order_events(self, order_id):
+        with self.db.connection() as conn:
+            return journal.order_events(conn, order_id)
+
+    def rebuild_stats(self):
+        with self.db.transaction() as conn:
+            stats.rebuild(conn)
+
+    # 주방/바 대기열
+
+    def refresh_kitchen(self, kitchen, menu):
+        kitchen.refresh_if_stale(self.db, menu)
+
+    def claim_ticket(self, kitchen, station, menu):
+        try:
+            with self.db.transaction() as conn:
+                ticket = kitchen.claim(conn, station, menu)
+        except Exception:
+            kitchen.invalidate()
+            raise
+        self._journal()
+        return ticket
+
+
+# 주기적으로 archive() 를 실행하는 백그라운드 스레드 (get_storages() 가 돌려주는 저장소마다)
+def start_archiver(get_storages, interval_seconds, older_than_minutes):
+    def run():
+        while not stop.wait(interval_seconds):
+            for storage in get_storages():
+                try:
+                    storage.archive(older_than_minutes)
+                except Exception:
+                    # 락 충돌 등은 다음 주기에 다시 시도
+                    logger.exception("주문 이력 이동 실패 (%s), 다음 주기에 다시 시도", storage.db.path)
+
+    stop = threading.Event()
+    threading.Thread(target=run, name="order-archiver", daemon=True).start()
+    return stop
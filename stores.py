@@ -0,0 +1,194 @@
+import re
+import threading
+from collections import OrderedDict
+
+from flask import abort, g, request
+
+import config
+import migrations
+import pages
+from db import AsyncDatabase
+from journal import Journal
+from kitchen import KitchenQueue
+from storage import Storage, open_database
+from events import Broker
+from writequeue import WriteQueue
+
+STORE_PREFIX = re.compile(r"^/s/([A-Za-z0-9_-]+)(?=/|$)")
+
+
+# 매장 하나의 자원: 저장소(DB + 그룹 커밋 큐 + 이벤트 저널), 관리자 화면 이벤트 브로커, 준비 대기열
+class Store:
+    def __init__(self, key, settings):
+        self.key = key
+        self.name = settings.get("name", key)
+        self.layout = settings["layout"]
+        self.db = open_database(settings.get("db_file") or config.DB_FILE)
+        migrations.migrate(self.db)
+        self.journal = None
+        if config.JOURNAL_ENABLED:
+            self.journal = Journal(self.db)
+            self.journal.recover()
+        self.write_queue = WriteQueue(self.db)
+        self.storage = Storage(self.db, self.write_queue, self.journal)
+        self.broker = Broker(watch=lambda: self.db.query_one("SELECT value FROM order_seq WHERE id = 1")[0])
+        self.kitchen = KitchenQueue()
+        self.users = 0  # 이 매장을 쓰는 중인 요청/스트림 수 (StoreRegistry 잠금 안에서만 변경)
+        self._async_db = None
+
+    @property
+    def seats(self):
+        return sorted(set(self.layout["column"]) | set(self.layout["row"]))
+
+    @property
+    def async_db(self):
+        if self._async_db is None:
+            self._async_db = AsyncDatabase(self.db)
+        return self._async_db
+
+    # fork 직전 (gunicorn preload 마스터)
+    def before_fork(self):
+        self.db.before_fork()
+
+    # 워커가 요청을 받기 전에 (fork 된 경우 포함): 커넥션을 미리 열고, 메모리 엔진은 스냅샷 이후의 저널을 다시 적용
+    def prepare_worker(self):
+        if self.journal is not None:
+            self.journal.recover()
+        else:
+            self.db.query_one("SELECT 1")
+
+    def close(self):
+        self.write_queue.close()
+        if self.journal is not None:
+            self.journal.close()
+        self.db.close_all()
+        pages.page_cache.drop(self.key)
+
+
+# 매장은 처음 요청이 들어올 때 열고, 최대 STORE_CACHE_SIZE 개까지만 열어 둠 (LRU)
+# 처음 여는 매장의 준비(마이그레이션, 저널 복구)는 매장별 잠금 안에서 하므로 다른 매장 요청은 기다리지 않음
+# 요청 처리 중이거나 관리자 실시간 스트림이 연결된 매장(users > 0)은 닫지 않음 (그동안은 잠시 최대 개수를 넘을 수 있음)
+class StoreRegistry:
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize or config.STORE_CACHE_SIZE
+        self._stores = OrderedDict()
+        self._opening = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, retain):
+        with self._lock:
+            store = self._stores.get(key)
+            if store is not None:
+                self._stores.move_to_end(key)
+                if retain:
+                    store.users += 1
+            return store
+
+    # retain 이면 release() 할 때까지 이 매장을 닫지 않음
+    def get(self, key, retain=False):
+        settings = config.STORES.get(key)
+        if settings is None:
+            return None
+        store = self._lookup(key, retain)
+        if store is not None:
+            return store
+        with self._lock:
+            opening = self._opening.setdefault(key, threading.Lock())
+        with opening:
+            store = self._lookup(key, retain)
+            if store is not None:
+                return store
+            store = Store(key, settings)
+            with self._lock:
+                self._stores[key] = store
+                self._opening.pop(key, None)
+                if retain:
+                    store.users += 1
+                evicted = self._evict()
+        for old in evicted:
+            old.close()
+        return store
+
+    def retain(self, store):
+        with self._lock:
+            store.users += 1
+
+    def release(self, store):
+        with self._lock:
+            store.users -= 1
+            evicted = self._evict() if store.users == 0 else []
+        for old in evicted:
+            old.close()
+
+    # 오래 안 쓴 순서로, 쓰는 중이 아닌 매장만 목록에서 뺌 (가장 최근 매장은 남김, 잠금 안에서 호출, 닫기는 잠금 밖에서)
+    def _evict(self):
+        evicted = []
+        for key in list(self._stores)[:-1]:
+            if len(self._stores) <= self.maxsize:
+                break
+            if self._stores[key].users == 0:
+                evicted.append(self._stores.pop(key))
+        return evicted
+
+    def default(self):
+        return self.get(config.DEFAULT_STORE)
+
+    def open_stores(self):
+        with self._lock:
+            return list(self._stores.values())
+
+    def close_all(self):
+        with self._lock:
+            stores = list(self._stores.values())
+            self._stores.clear()
+        for store in stores:
+            store.close()
+
+
+registry = StoreRegistry()
+
+
+# (매장 키, URL 앞부분) - URL 의 /s/<키> 가 호스트 이름보다 우선
+def resolve(host, path):
+    match = STORE_PREFIX.match(path)
+    if match:
+        return match.group(1), match.group(0)
+    hostname = (host or "").split(":")[0].lower()
+    for key, settings in config.STORES.items():
+        if hostname in settings.get("hosts", ()):
+            return key, ""
+    return config.DEFAULT_STORE, ""
+
+
+# /s/<매장 키> 를 SCRIPT_NAME 으로 옮겨서 Flask 라우트와 url_for 가 그대로 동작하게 함
+class StoreMiddleware:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        key, prefix = resolve(environ.get("HTTP_HOST"), environ.get("PATH_INFO", ""))
+        if prefix:
+            environ["SCRIPT_NAME"] = environ.get("SCRIPT_NAME", "") + prefix
+            environ["PATH_INFO"] = environ["PATH_INFO"][len(prefix):] or "/"
+        environ["qr.store"] = key
+        return self.wsgi_app(environ, start_response)
+
+
+# 현재 요청의 매장 (없는 매장이면 404)
+# 요청이 끝날 때(release_current) 까지 닫히지 않음
+def current():
+    store = g.get("store")
+    if store is None:
+        key = request.environ.get("qr.store") or resolve(request.host, request.path)[0]
+        store = registry.get(key, retain=True)
+        if store is None:
+            abort(404)
+        g.store = store
+    return store
+
+
+# app.teardown_request 에 등록
+def release_current(exc=None):
+    store = g.pop("store", None)
+    if store is not None:
+        registry.release(store)
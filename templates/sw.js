@@ -0,0 +1,64 @@
+// 손님 주문 화면용 서비스 워커 (/sw.js, 매장 경로 아래 전체가 범위)
+// - 정적 파일(해시 파일명)은 캐시 우선, 주문 페이지와 메뉴는 네트워크 우선 + 오프라인이면 캐시
+// - 주문 POST 는 건드리지 않음 (오프라인 대기열과 재전송은 order.js 가 멱등 키와 함께 처리)
+const ROOT = {{ root | tojson }};
+const CACHE = "qr-order-{{ version }}";
+const PRECACHE = {{ precache | tojson }};
+
+self.addEventListener("install", event => {
+    event.waitUntil(caches.open(CACHE).then(cache => cache.addAll(PRECACHE)).then(() => self.skipWaiting()));
+});
+
+self.addEventListener("activate", event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys.filter(key => key.startsWith("qr-order-") && key !== CACHE)
+                                          .map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+});
+
+// 페이지가 자기 주소를 알려주면 캐시에 넣어 둠 (처음 방문한 페이지는 서비스 워커를 거치지 않았으므로)
+self.addEventListener("message", event => {
+    if (event.data && event.data.type === "cache") {
+        event.waitUntil(caches.open(CACHE).then(cache => cache.addAll(event.data.urls)).catch(() => {}));
+    }
+});
+
+function isPage(url) {
+    return url.pathname === ROOT + "/order" || url.pathname === ROOT + "/order-complete"
+        || url.pathname === ROOT + "/api/menu";
+}
+
+function networkFirst(request) {
+    return fetch(request).then(response => {
+        if (response.ok) {
+            const copy = response.clone();
+            caches.open(CACHE).then(cache => cache.put(request, copy));
+        }
+        return response;
+    }).catch(() => caches.match(request).then(cached => cached || Promise.reject(new Error("offline"))));
+}
+
+function cacheFirst(request) {
+    return caches.match(request).then(cached => cached || fetch(request).then(response => {
+        if (response.ok) {
+            const copy = response.clone();
+            caches.open(CACHE).then(cache => cache.put(request, copy));
+        }
+        return response;
+    }));
+}
+
+self.addEventListener("fetch", event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (request.method !== "GET" || url.origin !== self.location.origin) {
+        return;
+    }
+    if (url.pathname.startsWith(ROOT + "/assets/")) {
+        event.respondWith(cacheFirst(request));
+    } else if (isPage(url)) {
+        event.respondWith(networkFirst(request));
+    }
+});
@@ -0,0 +1,108 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import config
+import metrics
+
+_STOP = object()
+
+
+# 그룹 커밋 쓰기 큐
+# 요청 스레드는 쓰기 작업(fn(conn))을 넣고 결과를 기다리기만 하고,
+# 전용 스레드가 몇 ms 동안 모인 작업을 하나의 트랜잭션(= fsync 한 번)으로 커밋함.
+# 작업마다 SAVEPOINT 를 걸어서 하나가 실패해도 같은 배치의 다른 주문은 그대로 저장됨
+class WriteQueue:
+    def __init__(self, db, max_batch=None, max_latency_ms=None):
+        self.db = db
+        self.max_batch = max_batch or config.WRITE_BATCH_SIZE
+        self.max_latency = (max_latency_ms if max_latency_ms is not None
+                            else config.WRITE_BATCH_LATENCY_MS) / 1000
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+
+    def _ensure_started(self):
+        # 스레드는 fork 후 자식 프로세스로 넘어가지 않으므로 프로세스마다 새로 띄움
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def submit(self, fn):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    # 작업을 넣고 커밋될 때까지 기다린 뒤 fn 의 반환값을 돌려줌
+    def execute(self, fn, timeout=None):
+        start = time.perf_counter()
+        try:
+            return self.submit(fn).result(timeout or config.WRITE_TIMEOUT_SECONDS)
+        finally:
+            metrics.record_db_wait(time.perf_counter() - start)
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _STOP:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect(self._queue.get())
+            stop = _STOP in batch
+            self._commit([item for item in batch if item is not _STOP])
+            if stop:
+                return
+
+    def _commit(self, batch):
+        if not batch:
+            return
+        results = []
+        try:
+            with self.db.transaction() as conn:
+                for fn, future in batch:
+                    conn.execute("SAVEPOINT write_item")
+                    try:
+                        results.append((future, fn(conn), None))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write_item")
+                        results.append((future, None, e))
+                    conn.execute("RELEASE write_item")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        # 커밋이 끝난 뒤에야 결과를 알려줌 (응답 전에 디스크에 기록되어 있음을 보장)
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    # 남은 작업을 모두 커밋하고 스레드를 종료 (워커 종료 시)
+    def close(self, timeout=None):
+        with self._lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                return
+            self._queue.put(_STOP)
+            thread = self._thread
+            self._pid = None
+        thread.join(timeout)